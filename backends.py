@@ -0,0 +1,646 @@
+"""Backends de graphe utilisés par les outils MCP.
+
+- Neo4jBackend : exécute le catalogue de requêtes Cypher (queries.py)
+- InMemoryBackend : index d'adjacence en mémoire construit depuis les
+  fichiers du loader, pour les tests, les benchmarks et les petits catalogues
+
+Les deux renvoient des enregistrements de même forme (mêmes clés que les
+RETURN du catalogue), si bien que le formatage des réponses est partagé.
+"""
+
+import asyncio
+import time
+from bisect import bisect_left
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from neo4j import READ_ACCESS, unit_of_work
+
+import queries
+import schema
+from collaborative import EXPORT_RATINGS
+from loader import DATASETS, find_dataset, read_rows
+from metrics import METRICS_PROFILE, current_tool, metrics
+from pagerank import EXPORT_GRAPH
+from queries import fulltext_terms, max_edits
+
+# Nombre de recommandations renvoyées par recommend_movies
+RECOMMENDATION_LIMIT = 5
+
+# Termes de recherche dont l'expansion (tokens du vocabulaire) est gardée, par index
+TERM_EXPANSIONS = 4096
+
+
+class GraphBackend:
+    """Operations the MCP tools need from the movie graph"""
+
+    # query_graph n'est proposé que par les backends qui exécutent du Cypher
+    runs_cypher = False
+
+    async def prepare(self):
+        """Get the backend ready to serve (schema, warm-up)"""
+
+    async def search_movies(self, arguments: dict) -> tuple[list[dict], int]:
+        """One page of movies matching the search filters, and the total number of matches"""
+        raise NotImplementedError
+
+    async def user_preferences(self, user_name: str) -> list[dict]:
+        raise NotImplementedError
+
+    async def recommend_similar(self, user_name: str) -> list[dict]:
+        """Recommendations from the precomputed SIMILAR neighbours (empty if not computed)"""
+        raise NotImplementedError
+
+    async def recommend_by_genre(self, user_name: str) -> list[dict]:
+        raise NotImplementedError
+
+    async def recommend_similar_batch(self, user_names: list[str]) -> dict[str, list[dict]]:
+        """recommend_similar for several users in one round-trip"""
+        return {name: await self.recommend_similar(name) for name in user_names}
+
+    async def recommend_by_genre_batch(self, user_names: list[str]) -> dict[str, list[dict]]:
+        """recommend_by_genre for several users in one round-trip"""
+        return {name: await self.recommend_by_genre(name) for name in user_names}
+
+    async def movies_by_title(self, titles: list[str]) -> list[dict]:
+        """Recommendation-shaped records for the given titles, in the same order"""
+        raise NotImplementedError
+
+    async def movie_details(self, title: str) -> dict | None:
+        raise NotImplementedError
+
+    async def closest_title(self, title: str) -> str | None:
+        """Best fuzzy match for a title that has no exact match"""
+        return None
+
+    async def movie_details_batch(self, titles: list[str]) -> dict[str, dict]:
+        """movie_details for several titles in one round-trip; unknown titles are left out"""
+        details = {title: await self.movie_details(title) for title in titles}
+        return {title: movie for title, movie in details.items() if movie}
+
+    async def ratings(self) -> list[dict]:
+        """Every LIKES rating as {user, title, rating}"""
+        raise NotImplementedError
+
+    async def graph_edges(self) -> list[dict]:
+        """Every edge around the movies as {title, type, node, weight}, for the graph walks"""
+        raise NotImplementedError
+
+    async def write_ratings(self, rows: list[dict]) -> int:
+        """Create or update LIKES ratings in one transaction; unknown titles are skipped
+
+        Returns the number of ratings written.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot write ratings")
+
+    async def run_cypher(self, query: str, max_rows: int, max_bytes: int,
+                         timeout: float, fetch_size: int) -> dict:
+        """Run an arbitrary read-only Cypher query, stopping at the row or byte budget
+
+        Returns {records, truncated, result_available_after, result_consumed_after}.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot run Cypher queries")
+
+    def pool_stats(self) -> dict | None:
+        """Connection pool utilization, for backends that hold a pool"""
+        return None
+
+    async def close(self):
+        """Release the backend's resources"""
+
+
+def _group_by_key(rows: list[dict]) -> dict[str, list[dict]]:
+    """Split the rows of a batch query by their `key` column, keeping their order"""
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row.pop("key"), []).append(row)
+    return grouped
+
+
+class Neo4jBackend(GraphBackend):
+    """Backend running the Cypher query catalog on the async Neo4j driver"""
+
+    runs_cypher = True
+
+    def __init__(self, driver, max_concurrent_queries: int, database: str | None = None,
+                 max_pool_size: int | None = None, warm_connections: int = 0):
+        self.driver = driver
+        self.max_concurrent_queries = max_concurrent_queries
+        self.query_slots = asyncio.Semaphore(max_concurrent_queries)
+        # Base épinglée : évite la résolution de la base par défaut à chaque session
+        self.database = database
+        self.max_pool_size = max_pool_size
+        self.warm_connections = warm_connections
+        # Utilisation du pool : sessions ouvertes, attentes d'un créneau
+        self.active_sessions = 0
+        self.peak_sessions = 0
+        self.sessions_opened = 0
+        self.slot_waits = 0
+        self.slot_wait_ms = 0.0
+        self.max_slot_wait_ms = 0.0
+
+    @asynccontextmanager
+    async def session(self, **config):
+        """Open a session on the pinned database once a query slot is free
+
+        Time spent waiting for a slot and the number of sessions open at once
+        feed pool_stats().
+        """
+        waited = self.query_slots.locked()
+        start = time.perf_counter()
+        async with self.query_slots:
+            if waited:
+                wait_ms = (time.perf_counter() - start) * 1000
+                self.slot_waits += 1
+                self.slot_wait_ms += wait_ms
+                self.max_slot_wait_ms = max(self.max_slot_wait_ms, wait_ms)
+            self.active_sessions += 1
+            self.sessions_opened += 1
+            self.peak_sessions = max(self.peak_sessions, self.active_sessions)
+            try:
+                async with self.driver.session(database=self.database, **config) as session:
+                    yield session
+            finally:
+                self.active_sessions -= 1
+
+    async def run_query(self, query: str, params: dict | None = None) -> list[dict]:
+        """Run a Cypher query without blocking the event loop and return its records
+
+        The round-trip and materialization are timed for the current tool,
+        and the result summary feeds the server metrics.
+        """
+        tool = current_tool.get()
+        text = "PROFILE " + query if METRICS_PROFILE else query
+        async with self.session() as session:
+            start = time.perf_counter()
+            result = await session.run(text, params)
+            fetched = time.perf_counter()
+            records = [dict(record) async for record in result]
+            done = time.perf_counter()
+            summary = await result.consume()
+        metrics.observe(tool, "db", (fetched - start) * 1000)
+        metrics.observe(tool, "materialize", (done - fetched) * 1000)
+        metrics.record_query(query, params, len(records), (done - start) * 1000, summary)
+        return records
+
+    async def run_single(self, query: str, params: dict | None = None) -> dict | None:
+        """Run a Cypher query expected to return at most one record"""
+        records = await self.run_query(query, params)
+        return records[0] if records else None
+
+    async def prepare(self):
+        """Check the connection, open the warm connections and apply the schema"""
+        await self.driver.verify_connectivity()
+        await asyncio.gather(*[self._warm_up() for _ in range(self.warm_connections)])
+        await schema.apply_schema_async(self.driver, self.database)
+
+    async def _warm_up(self):
+        async with self.session() as session:
+            result = await session.run("RETURN 1")
+            await result.consume()
+
+    async def search_movies(self, arguments: dict) -> tuple[list[dict], int]:
+        with metrics.span(current_tool.get(), "build"):
+            query, count_query, params = queries.search_movies_query(arguments)
+        movies, total = await asyncio.gather(
+            self.run_query(query, params),
+            self.run_single(count_query, params)
+        )
+        return movies, total["total"] if total else len(movies)
+
+    async def user_preferences(self, user_name: str) -> list[dict]:
+        return await self.run_query(queries.GET_USER_PREFERENCES, {"user_name": user_name})
+
+    async def recommend_similar(self, user_name: str) -> list[dict]:
+        return await self.run_query(queries.RECOMMEND_SIMILAR, {"user_name": user_name})
+
+    async def recommend_by_genre(self, user_name: str) -> list[dict]:
+        return await self.run_query(queries.RECOMMEND_MOVIES, {"user_name": user_name})
+
+    async def recommend_similar_batch(self, user_names: list[str]) -> dict[str, list[dict]]:
+        return _group_by_key(await self.run_query(queries.RECOMMEND_SIMILAR_BATCH, {"keys": user_names}))
+
+    async def recommend_by_genre_batch(self, user_names: list[str]) -> dict[str, list[dict]]:
+        return _group_by_key(await self.run_query(queries.RECOMMEND_MOVIES_BATCH, {"keys": user_names}))
+
+    async def movies_by_title(self, titles: list[str]) -> list[dict]:
+        return await self.run_query(queries.RECOMMENDED_DETAILS, {"titles": titles}) if titles else []
+
+    async def movie_details(self, title: str) -> dict | None:
+        return await self.run_single(queries.GET_MOVIE_DETAILS, {"title": title})
+
+    async def closest_title(self, title: str) -> str | None:
+        query = queries.fulltext_query(title, field="title", require_all=False)
+        if not query:
+            return None
+        match = await self.run_single(queries.FUZZY_MOVIE_TITLE, {"query": query})
+        return match["title"] if match else None
+
+    async def movie_details_batch(self, titles: list[str]) -> dict[str, dict]:
+        rows = _group_by_key(await self.run_query(queries.GET_MOVIE_DETAILS_BATCH, {"keys": titles}))
+        return {title: movie_rows[0] for title, movie_rows in rows.items()}
+
+    async def ratings(self) -> list[dict]:
+        return await self.run_query(EXPORT_RATINGS)
+
+    async def graph_edges(self) -> list[dict]:
+        return await self.run_query(EXPORT_GRAPH)
+
+    async def write_ratings(self, rows: list[dict]) -> int:
+        async def write(tx):
+            result = await tx.run(queries.RATE_MOVIES, rows=rows)
+            record = await result.single()
+            return record["written"] if record else 0
+
+        async with self.session() as session:
+            return await session.execute_write(write)
+
+    async def run_cypher(self, query: str, max_rows: int, max_bytes: int,
+                         timeout: float, fetch_size: int) -> dict:
+        # Le délai s'applique à la transaction gérée (Query n'est accepté que par session.run)
+        @unit_of_work(timeout=timeout)
+        async def stream(tx):
+            result = await tx.run(query)
+            records, size, truncated = [], 0, False
+            async for record in result:
+                row = dict(record)
+                size += len(str(row))
+                if len(records) >= max_rows or size > max_bytes:
+                    truncated = True
+                    break
+                records.append(row)
+            # Abandonne le reste du flux côté serveur
+            summary = await result.consume()
+            return records, truncated, summary
+
+        start = time.perf_counter()
+        async with self.session(default_access_mode=READ_ACCESS, fetch_size=fetch_size) as session:
+            records, truncated, summary = await session.execute_read(stream)
+        elapsed = (time.perf_counter() - start) * 1000
+        metrics.observe(current_tool.get(), "db", elapsed)
+        metrics.record_query(query, None, len(records), elapsed, summary)
+        return {
+            "records": records,
+            "truncated": truncated,
+            "result_available_after": summary.result_available_after,
+            "result_consumed_after": summary.result_consumed_after,
+        }
+
+    def pool_stats(self) -> dict:
+        return {
+            "database": self.database,
+            "max_pool_size": self.max_pool_size,
+            "query_slots": self.max_concurrent_queries,
+            "active_sessions": self.active_sessions,
+            "peak_sessions": self.peak_sessions,
+            "sessions_opened": self.sessions_opened,
+            "slot_waits": self.slot_waits,
+            "mean_slot_wait_ms": self.slot_wait_ms / self.slot_waits if self.slot_waits else 0.0,
+            "max_slot_wait_ms": self.max_slot_wait_ms,
+        }
+
+    async def close(self):
+        await self.driver.close()
+
+
+class Movie:
+    __slots__ = ("title", "year", "rating", "description", "genres", "actors", "directors", "likes")
+
+    def __init__(self, title, year=None, rating=None, description=None):
+        self.title = title
+        self.year = year
+        self.rating = rating
+        self.description = description
+        self.genres = []
+        self.actors = []
+        self.directors = []
+        # Nom de l'utilisateur -> note
+        self.likes = {}
+
+
+class Person:
+    __slots__ = ("name", "label", "nationality", "movies")
+
+    def __init__(self, name, label, nationality=None):
+        self.name = name
+        self.label = label
+        self.nationality = nationality
+        self.movies = []
+
+
+class User:
+    __slots__ = ("name", "age", "preferences", "likes")
+
+    def __init__(self, name, age=None, preferences=None):
+        self.name = name
+        self.age = age
+        self.preferences = preferences
+        # Titre du film -> note
+        self.likes = {}
+
+
+def _rating_order(movie: Movie):
+    return -(movie.rating or 0), movie.title
+
+
+def _edit_distance(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def _term_score(term: str, token: str) -> float:
+    """How well a search term matches a token, like the Lucene prefix/fuzzy query"""
+    if token == term:
+        return 1.0
+    if token.startswith(term):
+        return 0.75
+    edits = max_edits(term)
+    if edits and abs(len(token) - len(term)) <= edits:
+        distance = _edit_distance(term, token)
+        if distance <= edits:
+            return 0.5 / distance
+    return 0.0
+
+
+def _pieces(term: str, count: int) -> list[str]:
+    """Split a term into count pieces: within count - 1 edits, one of them is left intact"""
+    size = len(term) / count
+    return [term[round(i * size):round((i + 1) * size)] for i in range(count)]
+
+
+class TokenIndex:
+    """Inverted index of one text field, expanding search terms over its vocabulary
+
+    Terms are matched against the distinct tokens only (prefix by bisection,
+    fuzzy after a substring filter), and the expansions are kept until the
+    index is rebuilt.
+    """
+
+    def __init__(self, documents):
+        # Token -> clés des documents qui le contiennent
+        self.postings: dict[str, set] = {}
+        for key, text in documents:
+            for token in fulltext_terms(text or ""):
+                self.postings.setdefault(token, set()).add(key)
+        self.vocabulary = sorted(self.postings)
+        self.by_length: dict[int, list[str]] = {}
+        for token in self.vocabulary:
+            self.by_length.setdefault(len(token), []).append(token)
+        # Terme -> {token: score}, les plus anciens évincés en premier
+        self._expansions: dict[str, dict[str, float]] = {}
+
+    def expand(self, term: str) -> dict[str, float]:
+        """Tokens matching a term, scored like _term_score"""
+        if term in self._expansions:
+            return self._expansions[term]
+        tokens = {}
+        i = bisect_left(self.vocabulary, term)
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(term):
+            tokens[self.vocabulary[i]] = _term_score(term, self.vocabulary[i])
+            i += 1
+        edits = max_edits(term)
+        if edits:
+            pieces = _pieces(term, edits + 1)
+            for length in range(len(term) - edits, len(term) + edits + 1):
+                for token in self.by_length.get(length, ()):
+                    if token not in tokens and any(piece in token for piece in pieces):
+                        score = _term_score(term, token)
+                        if score:
+                            tokens[token] = score
+        if len(self._expansions) >= TERM_EXPANSIONS:
+            del self._expansions[next(iter(self._expansions))]
+        self._expansions[term] = tokens
+        return tokens
+
+    def scores(self, term: str) -> dict:
+        """Best score of the term in each matching document"""
+        scores = {}
+        for token, score in self.expand(term).items():
+            for key in self.postings[token]:
+                if score > scores.get(key, 0.0):
+                    scores[key] = score
+        return scores
+
+
+def _fulltext_scores(terms: list[str], fields: list[tuple[TokenIndex, float]], require_all: bool = True) -> dict:
+    """Score of every matching document against the search terms, over weighted fields"""
+    total = None
+    for term in terms:
+        best = {}
+        for index, weight in fields:
+            for key, score in index.scores(term).items():
+                if score * weight > best.get(key, 0.0):
+                    best[key] = score * weight
+        if total is None:
+            total = best
+        elif require_all:
+            total = {key: total[key] + score for key, score in best.items() if key in total}
+        else:
+            for key, score in best.items():
+                total[key] = total.get(key, 0.0) + score
+    return total or {}
+
+
+class InMemoryBackend(GraphBackend):
+    """Backend serving the tools from in-memory adjacency indexes"""
+
+    def __init__(self):
+        self.movies: dict[str, Movie] = {}
+        self.people: dict[tuple[str, str], Person] = {}
+        self.users: dict[str, User] = {}
+        # Genre -> films, dans l'ordre de note décroissante une fois indexé
+        self.by_genre: dict[str, list[Movie]] = {}
+        self.by_rating: list[Movie] = []
+        # Index plein texte (titres, descriptions, noms par étiquette), construits par reindex()
+        self.title_index = TokenIndex([])
+        self.description_index = TokenIndex([])
+        self.name_index: dict[str, TokenIndex] = {}
+
+    @classmethod
+    def from_directory(cls, directory) -> "InMemoryBackend":
+        """Build the indexes from a directory in the loader's file format"""
+        backend = cls()
+        directory = Path(directory)
+        for name in DATASETS:
+            path = find_dataset(directory, name)
+            if path is not None:
+                backend.add_rows(name, read_rows(path))
+        backend.reindex()
+        return backend
+
+    def add_rows(self, name: str, rows):
+        """Add the rows of one loader dataset; call reindex() once done"""
+        for row in rows:
+            if name == "genres":
+                self.by_genre.setdefault(row["name"], [])
+            elif name == "movies":
+                movie = self.movies.get(row["title"]) or Movie(row["title"])
+                movie.year, movie.rating, movie.description = row.get("year"), row.get("rating"), row.get("description")
+                self.movies[movie.title] = movie
+                for genre in row.get("genres") or []:
+                    if genre not in movie.genres:
+                        movie.genres.append(genre)
+                        self.by_genre.setdefault(genre, []).append(movie)
+            elif name == "people":
+                self.people[row["label"], row["name"]] = Person(row["name"], row["label"], row.get("nationality"))
+            elif name == "credits":
+                label, names = ("Actor", "actors") if row["type"] == "ACTED_IN" else ("Director", "directors")
+                person = self.people.get((label, row["person"]))
+                movie = self.movies.get(row["title"])
+                if person and movie and person.name not in getattr(movie, names):
+                    getattr(movie, names).append(person.name)
+                    person.movies.append(movie)
+            elif name == "users":
+                self.users[row["name"]] = User(row["name"], row.get("age"), row.get("preferences"))
+            elif name == "ratings":
+                user = self.users.get(row["user"])
+                movie = self.movies.get(row["title"])
+                if user and movie:
+                    user.likes[movie.title] = row["rating"]
+                    movie.likes[user.name] = row["rating"]
+
+    def reindex(self):
+        """Sort the rating-ordered indexes and rebuild the full-text indexes after rows were added"""
+        self.by_rating = sorted(self.movies.values(), key=_rating_order)
+        for movies in self.by_genre.values():
+            movies.sort(key=_rating_order)
+        self.title_index = TokenIndex((title, title) for title in self.movies)
+        self.description_index = TokenIndex((movie.title, movie.description) for movie in self.movies.values())
+        self.name_index = {
+            label: TokenIndex((name, name) for person_label, name in self.people if person_label == label)
+            for label in ("Actor", "Director")
+        }
+
+    def _people_matching(self, label: str, text: str) -> set[str]:
+        names = _fulltext_scores(fulltext_terms(text), [(self.name_index[label], 1.0)])
+        return {movie.title for name in names for movie in self.people[label, name].movies}
+
+    def _movie_fields(self) -> list[tuple[TokenIndex, float]]:
+        # Le titre, plus court, pèse plus que la description (comme la norme de longueur de Lucene)
+        return [(self.title_index, 1.0), (self.description_index, 0.5)]
+
+    @staticmethod
+    def _movie_record(movie: Movie) -> dict:
+        return {
+            "title": movie.title,
+            "year": movie.year,
+            "rating": movie.rating,
+            "description": movie.description,
+            "actors": list(movie.actors),
+            "directors": list(movie.directors),
+        }
+
+    async def search_movies(self, arguments: dict) -> tuple[list[dict], int]:
+        filters, limit, offset = queries.search_page(arguments)
+        candidates = self.by_genre.get(filters["genre"], []) if "genre" in filters else self.by_rating
+        allowed = None
+        if "actor" in filters:
+            allowed = self._people_matching("Actor", filters["actor"])
+        if "director" in filters:
+            directed = self._people_matching("Director", filters["director"])
+            allowed = directed if allowed is None else allowed & directed
+        min_rating = filters.get("min_rating")
+
+        matches = [
+            movie for movie in candidates
+            if (allowed is None or movie.title in allowed)
+            and (min_rating is None or (movie.rating is not None and movie.rating >= min_rating))
+        ]
+        if "query" in filters:
+            # Classement par pertinence, puis par note comme dans Neo4j
+            scores = _fulltext_scores(fulltext_terms(filters["query"]), self._movie_fields())
+            scored = [(scores[movie.title], movie) for movie in matches if movie.title in scores]
+            scored.sort(key=lambda item: (-item[0], _rating_order(item[1])))
+            matches = [movie for score, movie in scored]
+        page = [
+            {**self._movie_record(movie), "genres": list(movie.genres)}
+            for movie in matches[offset:offset + limit]
+        ]
+        return page, len(matches)
+
+    async def user_preferences(self, user_name: str) -> list[dict]:
+        user = self.users.get(user_name)
+        if user is None:
+            return []
+        return [
+            {"title": title, "rating": rating, "year": self.movies[title].year,
+             "description": self.movies[title].description, "genres": list(self.movies[title].genres)}
+            for title, rating in sorted(user.likes.items(), key=lambda item: -item[1])
+        ]
+
+    async def recommend_similar(self, user_name: str) -> list[dict]:
+        # Pas d'index SIMILAR en mémoire : le serveur se replie sur les genres
+        return []
+
+    async def recommend_by_genre(self, user_name: str) -> list[dict]:
+        user = self.users.get(user_name)
+        if user is None:
+            return []
+        # Chaque genre des films aimés n'est parcouru qu'une fois
+        liked_genres = dict.fromkeys(g for title in user.likes for g in self.movies[title].genres)
+        shared = {}
+        for genre in liked_genres:
+            for movie in self.by_genre.get(genre, []):
+                if movie.title not in user.likes:
+                    shared.setdefault(movie.title, []).append(genre)
+        ranked = sorted(shared.items(), key=lambda item: (-len(item[1]), _rating_order(self.movies[item[0]])))
+        return [
+            {**self._movie_record(self.movies[title]), "shared_genres": genres, "genre_match_count": len(genres)}
+            for title, genres in ranked[:RECOMMENDATION_LIMIT]
+        ]
+
+    async def movies_by_title(self, titles: list[str]) -> list[dict]:
+        return [self._movie_record(self.movies[title]) for title in titles if title in self.movies]
+
+    async def movie_details(self, title: str) -> dict | None:
+        movie = self.movies.get(title)
+        if movie is None:
+            return None
+        return {
+            **self._movie_record(movie),
+            "genres": list(movie.genres),
+            "user_ratings": [{"user": user, "rating": rating} for user, rating in movie.likes.items()],
+        }
+
+    async def closest_title(self, title: str) -> str | None:
+        scores = _fulltext_scores(fulltext_terms(title), [(self.title_index, 1.0)], require_all=False)
+        best = min(scores, key=lambda match: (-scores[match], _rating_order(self.movies[match])), default=None)
+        return best
+
+    async def ratings(self) -> list[dict]:
+        return [
+            {"user": user.name, "title": title, "rating": rating}
+            for user in self.users.values()
+            for title, rating in user.likes.items()
+        ]
+
+    async def graph_edges(self) -> list[dict]:
+        edges = []
+        for movie in self.movies.values():
+            edges += [{"title": movie.title, "type": "HAS_GENRE", "node": g, "weight": 1.0} for g in movie.genres]
+            edges += [{"title": movie.title, "type": "ACTED_IN", "node": a, "weight": 1.0} for a in movie.actors]
+            edges += [{"title": movie.title, "type": "DIRECTED", "node": d, "weight": 1.0} for d in movie.directors]
+            edges += [
+                {"title": movie.title, "type": "LIKES", "node": user, "weight": rating / 5}
+                for user, rating in movie.likes.items()
+            ]
+        return edges
+
+    async def write_ratings(self, rows: list[dict]) -> int:
+        written = 0
+        for row in rows:
+            movie = self.movies.get(row["title"])
+            if movie is None:
+                continue
+            user = self.users.get(row["user"])
+            if user is None:
+                user = self.users[row["user"]] = User(row["user"])
+            user.likes[movie.title] = row["rating"]
+            movie.likes[user.name] = row["rating"]
+            written += 1
+        return written
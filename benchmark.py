@@ -0,0 +1,289 @@
+"""Benchmark des cinq outils MCP sur des graphes générés de taille croissante.
+
+Pour chaque taille, le graphe est généré dans les fichiers JSONL du loader,
+chargé dans Neo4j (ou dans le backend en mémoire), puis chaque branche de call_tool est appelée directement.
+Le résultat (latences p50/p95/p99, débit, db hits) est écrit en JSON pour
+comparer les commits entre eux.
+
+    python benchmark.py --sizes 1000 10000 --requests 200 --output bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from itertools import chain
+from pathlib import Path
+
+from neo4j import GraphDatabase
+from dotenv import load_dotenv
+
+import queries
+from loader import CLEAR_GRAPH, load_directory
+from metrics import sum_db_hits
+from schema import apply_schema
+from similarity import build_similarity_index
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+# Au-delà, SIMILAR n'est pas calculé et recommend_movies mesure le repli par genre
+SIMILARITY_MAX_SIZE = 100_000
+GENRES = 20
+TOOLS = ("search_movies", "get_user_preferences", "recommend_movies", "get_movie_details", "query_graph")
+
+SAMPLE_CYPHER = "MATCH (m:Movie) WHERE m.rating >= $min_rating RETURN m.title as title LIMIT 10"
+
+
+def _write_jsonl(path: Path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+
+
+def generate_graph(directory, movies: int, actors: int | None = None, directors: int | None = None,
+                   users: int | None = None, cast_size: int = 5, likes_per_user: int = 20,
+                   seed: int = 42, taste: float = 0.0) -> dict:
+    """Write a synthetic catalog in the loader's file format and return its dimensions
+
+    With taste > 0, that share of each user's likes is drawn from movies of two
+    favorite genres instead of uniformly, so recommendations have something to find.
+    """
+    directory = Path(directory)
+    rng = random.Random(seed)
+    actors = actors or max(movies // 2, 1)
+    directors = directors or max(movies // 10, 1)
+    users = users or max(movies // 10, 1)
+
+    _write_jsonl(directory / "genres.jsonl", ({"name": f"Genre {g}"} for g in range(GENRES)))
+    by_genre = [[] for _ in range(GENRES)]
+
+    def movie_rows():
+        for i in range(movies):
+            genres = rng.sample(range(GENRES), rng.randint(1, 3))
+            for g in genres:
+                by_genre[g].append(i)
+            yield {"title": f"Movie {i}", "year": rng.randint(1950, 2024), "rating": round(rng.uniform(1, 10), 1),
+                   "description": f"Synthetic movie number {i}", "genres": [f"Genre {g}" for g in genres]}
+
+    _write_jsonl(directory / "movies.jsonl", movie_rows())
+    _write_jsonl(directory / "people.jsonl", chain(
+        ({"name": f"Actor {i}", "label": "Actor", "nationality": "Synthetic"} for i in range(actors)),
+        ({"name": f"Director {i}", "label": "Director"} for i in range(directors)),
+    ))
+
+    def credits():
+        for i in range(movies):
+            for a in rng.sample(range(actors), min(cast_size, actors)):
+                yield {"person": f"Actor {a}", "title": f"Movie {i}", "type": "ACTED_IN", "role": f"Role {a}"}
+            yield {"person": f"Director {rng.randrange(directors)}", "title": f"Movie {i}", "type": "DIRECTED"}
+
+    _write_jsonl(directory / "credits.jsonl", credits())
+    _write_jsonl(directory / "users.jsonl", (
+        {"name": f"User {i}", "age": rng.randint(16, 80), "preferences": "Synthetic"} for i in range(users)
+    ))
+    def liked_movies():
+        if not taste:
+            return rng.sample(range(movies), min(likes_per_user, movies))
+        favorites = [m for g in rng.sample(range(GENRES), 2) for m in by_genre[g]]
+        liked = set()
+        while len(liked) < min(likes_per_user, movies):
+            liked.add(rng.choice(favorites) if favorites and rng.random() < taste else rng.randrange(movies))
+        return sorted(liked)
+
+    _write_jsonl(directory / "ratings.jsonl", (
+        {"user": f"User {u}", "title": f"Movie {m}", "rating": rng.randint(1, 5)}
+        for u in range(users)
+        for m in liked_movies()
+    ))
+    return {"movies": movies, "actors": actors, "directors": directors, "users": users,
+            "cast_size": cast_size, "likes_per_user": likes_per_user, "taste": taste}
+
+
+def tool_arguments(rng: random.Random, dimensions: dict) -> dict:
+    """Random arguments for each tool, drawn from the generated names"""
+    return {
+        "search_movies": lambda: rng.choice([
+            {"genre": f"Genre {rng.randrange(GENRES)}", "min_rating": 7},
+            {"actor": f"Actor {rng.randrange(dimensions['actors'])}"},
+            {"director": f"Director {rng.randrange(dimensions['directors'])}", "genre": f"Genre {rng.randrange(GENRES)}"},
+        ]),
+        "get_user_preferences": lambda: {"user_name": f"User {rng.randrange(dimensions['users'])}"},
+        "recommend_movies": lambda: {"user_name": f"User {rng.randrange(dimensions['users'])}"},
+        "get_movie_details": lambda: {"title": f"Movie {rng.randrange(dimensions['movies'])}"},
+        "query_graph": lambda: {"query": SAMPLE_CYPHER.replace("$min_rating", str(rng.randint(5, 9)))},
+    }
+
+
+def tool_queries(name: str, arguments: dict) -> list[list[tuple[str, dict]]]:
+    """The catalog queries a tool runs for the given arguments, used to count DB hits
+
+    Each step lists its queries in the order the server tries them: the next
+    one only runs when the previous one returned no rows.
+    """
+    if name == "search_movies":
+        query, count_query, params = queries.search_movies_query(arguments)
+        return [[(query, params)], [(count_query, params)]]
+    if name == "get_user_preferences":
+        return [[(queries.GET_USER_PREFERENCES, arguments)]]
+    if name == "recommend_movies":
+        # Repli sur les genres quand le film n'a pas de voisins SIMILAR
+        return [[(queries.RECOMMEND_SIMILAR, arguments), (queries.RECOMMEND_MOVIES, arguments)]]
+    if name == "get_movie_details":
+        return [[(queries.GET_MOVIE_DETAILS, arguments)]]
+    return [[(arguments["query"], {})]]
+
+
+def profile_db_hits(driver, query: str, params: dict, database: str | None = None) -> tuple[int, int]:
+    """Run a query under PROFILE and return the DB hits of its operator tree and its number of rows"""
+    with driver.session(database=database) as session:
+        result = session.run("PROFILE " + query, params)
+        rows = sum(1 for _ in result)
+        summary = result.consume()
+    return sum_db_hits(summary.profile), rows
+
+
+def tool_db_hits(driver, name: str, arguments: dict, database: str | None = None) -> int:
+    """DB hits of the queries one tool call actually runs"""
+    hits = 0
+    for step in tool_queries(name, arguments):
+        for query, params in step:
+            query_hits, rows = profile_db_hits(driver, query, params, database)
+            hits += query_hits
+            if rows:
+                break
+    return hits
+
+
+def percentile(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+async def run_tool(server, name: str, make_arguments, requests: int, concurrency: int) -> dict:
+    """Call one tool repeatedly and collect latency and throughput"""
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one_call():
+        arguments = make_arguments()
+        async with slots:
+            start = time.perf_counter()
+            await server.call_tool(name, arguments)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one_call() for _ in range(requests)])
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "mean_ms": statistics.fmean(latencies),
+        "throughput_rps": requests / elapsed,
+    }
+
+
+async def benchmark_size(server, sync_driver, dimensions: dict, requests: int, concurrency: int, seed: int) -> dict:
+    """Benchmark every tool; DB hits are only profiled on Neo4j (sync_driver set)"""
+    rng = random.Random(seed)
+    results = {}
+    for name, make_arguments in tool_arguments(rng, dimensions).items():
+        if sync_driver is None and name == "query_graph":
+            continue
+        await server.call_tool(name, make_arguments())  # warm-up
+        stats = await run_tool(server, name, make_arguments, requests, concurrency)
+        stats["db_hits"] = tool_db_hits(
+            sync_driver, name, make_arguments(), server.NEO4J_DATABASE
+        ) if sync_driver else None
+        results[name] = stats
+        print(f"  {name:22} p50 {stats['p50_ms']:8.2f} ms  p95 {stats['p95_ms']:8.2f} ms  "
+              f"p99 {stats['p99_ms']:8.2f} ms  {stats['throughput_rps']:8.1f} req/s  "
+              f"{stats['db_hits']} db hits")
+    return results
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_benchmark(args) -> dict:
+    if not args.cache:
+        os.environ["CACHE_DISABLED_TOOLS"] = ",".join(TOOLS)
+    os.environ["GRAPH_BACKEND"] = args.backend
+    if args.backend == "memory":
+        # Le backend en mémoire est reconstruit pour chaque taille
+        os.environ["MEMORY_DATA_DIR"] = str(Path(__file__).parent / "data" / "demo")
+    # Importé ici : le serveur lit sa configuration à l'import
+    import server
+    from backends import InMemoryBackend
+
+    sync_driver = GraphDatabase.driver(
+        os.getenv("NEO4J_URI"),
+        auth=(os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD"))
+    ) if args.backend == "neo4j" else None
+    report = {"commit": git_commit(), "backend": args.backend, "requests": args.requests,
+              "concurrency": args.concurrency, "sizes": []}
+    try:
+        for size in args.sizes:
+            print(f"🎬 {size} films : génération et chargement...")
+            with tempfile.TemporaryDirectory() as directory:
+                dimensions = generate_graph(directory, size, likes_per_user=args.likes_per_user, seed=args.seed)
+                if sync_driver is None:
+                    server.backend = InMemoryBackend.from_directory(directory)
+                else:
+                    # Même base que celle interrogée par le serveur
+                    database = server.NEO4J_DATABASE
+                    with sync_driver.session(database=database) as session:
+                        session.run(CLEAR_GRAPH).consume()
+                    apply_schema(sync_driver, database)
+                    load_directory(sync_driver, directory, args.batch_size, database)
+                    # Sans voisins SIMILAR, recommend_movies ne mesurerait que le repli par genre
+                    if size <= args.similarity_max_size:
+                        build_similarity_index(sync_driver, database=database)
+                    else:
+                        print(f"  ⏭️ SIMILAR non calculé au-delà de {args.similarity_max_size} films")
+            # Les réponses en cache et les modèles de la taille précédente ne servent plus
+            server.bump_graph_version()
+            tools = await benchmark_size(server, sync_driver, dimensions, args.requests, args.concurrency, args.seed)
+            report["sizes"].append({"dimensions": dimensions, "tools": tools})
+    finally:
+        if sync_driver is not None:
+            sync_driver.close()
+        await server.backend.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the MCP tools on generated graphs")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Number of movies of each generated graph")
+    parser.add_argument("--requests", type=int, default=200, help="Calls per tool and size")
+    parser.add_argument("--concurrency", type=int, default=8, help="Calls in flight at once")
+    parser.add_argument("--likes-per-user", type=int, default=20, help="LIKES edges per user")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Loader batch size")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--backend", choices=["neo4j", "memory"], default="neo4j",
+                        help="Graph backend to benchmark (memory needs no Neo4j, no DB hits)")
+    parser.add_argument("--cache", action="store_true", help="Keep the result cache enabled")
+    parser.add_argument("--similarity-max-size", type=int, default=SIMILARITY_MAX_SIZE,
+                        help=f"Largest graph whose SIMILAR relationships are built (default {SIMILARITY_MAX_SIZE})")
+    parser.add_argument("--output", default="bench_output.json", help="JSON report file")
+    args = parser.parse_args()
+
+    load_dotenv()
+    report = asyncio.run(run_benchmark(args))
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"\n✅ Rapport écrit dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Formats de réponse des outils MCP.
+
+- text : texte lisible, un bloc par film (format historique, voir server.py)
+- compact : une ligne par film, sans description sauf si demandée
+- json : charge utile en colonnes ; les personnes, genres et utilisateurs
+  sont stockés une seule fois et référencés par leur indice
+"""
+
+import json
+
+FORMATS = ["text", "compact", "json"]
+
+# Colonnes internées -> table partagée qui les stocke
+INTERNED_LISTS = {"actors": "people", "directors": "people", "genres": "genres", "shared_genres": "genres"}
+INTERNED_VALUES = {"user": "users"}
+
+
+def _interning(column: str, table: dict):
+    """Encoder of one column, or None when the column is kept as is"""
+    if column in INTERNED_LISTS:
+        ids = table(INTERNED_LISTS[column])
+        return lambda names: [ids.setdefault(name, len(ids)) for name in names]
+    if column in INTERNED_VALUES:
+        ids = table(INTERNED_VALUES[column])
+        return lambda name: ids.setdefault(name, len(ids))
+    if column == "user_ratings":
+        ids = table("users")
+        return lambda ratings: [[ids.setdefault(ur["user"], len(ids)), ur["rating"]] for ur in ratings if ur["user"]]
+    return None
+
+
+def columnar(records: list[dict], include_description: bool = False, intern: bool = True, **header) -> str:
+    """Encode records as {columns, rows} JSON, interning names in shared tables
+
+    Name lists (actors, genres...) become lists of indexes into the `people`,
+    `genres` and `users` tables; user_ratings become [user index, rating] pairs.
+    """
+    columns = list(dict.fromkeys(column for record in records for column in record))
+    if not include_description and "description" in columns:
+        columns.remove("description")
+    # Table -> {valeur: indice}, dans l'ordre d'insertion
+    tables = {}
+
+    def table(name: str) -> dict:
+        return tables.setdefault(name, {})
+
+    rows = [[record.get(column) for column in columns] for record in records]
+    if intern:
+        for i, column in enumerate(columns):
+            encode = _interning(column, table)
+            if encode is not None:
+                for row in rows:
+                    if row[i] is not None:
+                        row[i] = encode(row[i])
+
+    payload = {**header, "columns": columns, "rows": rows}
+    payload.update((name, list(ids)) for name, ids in tables.items())
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def recommendation_reason(recommendation: dict) -> str:
+    """Explain a recommendation from the strategy that produced it"""
+    if "cf_score" in recommendation:
+        return f"Liked by users with similar tastes (score {recommendation['cf_score']:.2f})"
+    if "walk_score" in recommendation:
+        return ("Close to your favorites through shared cast, crew, genres and fans "
+                f"(score {recommendation['walk_score']:.4f})")
+    if "similar_to" in recommendation:
+        return f"Similar to your favorites ({', '.join(recommendation['similar_to'])})"
+    return (f"Shares {recommendation['genre_match_count']} genre(s) with your favorites "
+            f"({', '.join(recommendation['shared_genres'])})")
+
+
+def _names(values: list[str] | None) -> str:
+    return ", ".join(values) if values else "-"
+
+
+def _line(movie: dict, include_description: bool, *fields: str) -> str:
+    parts = [f"{movie['title']} ({movie['year']})", *fields]
+    if include_description:
+        parts.append(movie["description"] or "-")
+    return " | ".join(parts)
+
+
+def compact_search_results(movies: list[dict], total: int, offset: int, include_description: bool) -> str:
+    if not movies:
+        return f"{total} movies"
+    header = f"{total} movies, {offset + 1}-{offset + len(movies)} (title | rating | genres | actors | directors):\n"
+    return header + "\n".join(
+        _line(m, include_description, f"{m['rating']}",
+              _names(m["genres"]), _names(m["actors"]), _names(m["directors"]))
+        for m in movies
+    )
+
+
+def compact_preferences(user_name: str, preferences: list[dict], include_description: bool) -> str:
+    if not preferences:
+        return f"{user_name}: not found or no preferences"
+    return f"{user_name} likes (title | user rating | genres):\n" + "\n".join(
+        _line(p, include_description, f"{p['rating']}/5", _names(p["genres"]))
+        for p in preferences
+    )
+
+
+def compact_recommendations(user_name: str, recommendations: list[dict], include_description: bool) -> str:
+    if not recommendations:
+        return f"{user_name}: no recommendations"
+    return f"{user_name} (title | rating | why):\n" + "\n".join(
+        _line(r, include_description, f"{r['rating']}", recommendation_reason(r))
+        for r in recommendations
+    )
+
+
+def compact_movie_details(title: str, movie: dict | None, include_description: bool) -> str:
+    if not movie:
+        return f"{title}: not found"
+    closest = f"{title} -> " if movie["title"] != title else ""
+    ratings = ", ".join(f"{ur['user']} {ur['rating']}/5" for ur in movie["user_ratings"] if ur["user"])
+    return closest + _line(movie, include_description, f"{movie['rating']}", _names(movie["genres"]),
+                           _names(movie["actors"]), _names(movie["directors"]), ratings or "no user ratings")
+
+
+def compact_query_results(result: dict) -> str:
+    records = result["records"]
+    columns = list(dict.fromkeys(column for record in records for column in record))
+    lines = [f"{len(records)} rows" + (" (truncated)" if result["truncated"] else "")]
+    if records:
+        lines.append("\t".join(columns))
+        lines += ["\t".join(str(record.get(column, "")) for column in columns) for record in records]
+    return "\n".join(lines)
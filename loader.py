@@ -0,0 +1,214 @@
+"""Import en masse d'un catalogue de films depuis des fichiers JSONL ou CSV.
+
+Un répertoire de données contient (chacun optionnel, en .jsonl ou .csv,
+éventuellement compressés en .gz) :
+
+- genres   : name
+- movies   : title, year, rating, description, genres (liste, "|" en CSV)
+- people   : name, label (Actor | Director), nationality
+- credits  : person, title, type (ACTED_IN | DIRECTED), role
+- users    : name, age, preferences
+- ratings  : user, title, rating
+
+Les fichiers sont lus en flux par lots, et chaque lot est écrit avec une
+seule requête UNWIND $rows dans une transaction d'écriture gérée.
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import os
+import time
+from itertools import islice
+from pathlib import Path
+
+from neo4j import GraphDatabase
+from dotenv import load_dotenv
+
+from schema import apply_schema
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Vide la base par lots de transactions (une seule transaction saturerait la mémoire)
+CLEAR_GRAPH = "MATCH (n) CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS"
+
+LOAD_GENRES = """
+UNWIND $rows AS row
+MERGE (:Genre {name: row.name})
+"""
+
+LOAD_MOVIES = """
+UNWIND $rows AS row
+MERGE (m:Movie {title: row.title})
+SET m.year = row.year, m.rating = row.rating, m.description = row.description
+WITH m, row
+UNWIND coalesce(row.genres, []) AS genre
+MERGE (g:Genre {name: genre})
+MERGE (m)-[:HAS_GENRE]->(g)
+"""
+
+LOAD_ACTORS = """
+UNWIND $rows AS row
+MERGE (a:Actor {name: row.name})
+SET a.nationality = row.nationality
+"""
+
+LOAD_DIRECTORS = """
+UNWIND $rows AS row
+MERGE (:Director {name: row.name})
+"""
+
+LOAD_ACTED_IN = """
+UNWIND $rows AS row
+MATCH (a:Actor {name: row.person}), (m:Movie {title: row.title})
+MERGE (a)-[r:ACTED_IN]->(m)
+SET r.role = row.role
+"""
+
+LOAD_DIRECTED = """
+UNWIND $rows AS row
+MATCH (d:Director {name: row.person}), (m:Movie {title: row.title})
+MERGE (d)-[:DIRECTED]->(m)
+"""
+
+LOAD_USERS = """
+UNWIND $rows AS row
+MERGE (u:User {name: row.name})
+SET u.age = row.age, u.preferences = row.preferences
+"""
+
+LOAD_RATINGS = """
+UNWIND $rows AS row
+MATCH (u:User {name: row.user}), (m:Movie {title: row.title})
+MERGE (u)-[l:LIKES]->(m)
+SET l.rating = row.rating
+WITH DISTINCT u
+MATCH (u)-[:LIKES]->(liked:Movie)
+SET liked.similarity_stale = true
+"""
+
+# Fichier -> (champ de routage, requête par valeur du champ), dans l'ordre de chargement
+DATASETS = {
+    "genres": (None, {None: LOAD_GENRES}),
+    "movies": (None, {None: LOAD_MOVIES}),
+    "people": ("label", {"Actor": LOAD_ACTORS, "Director": LOAD_DIRECTORS}),
+    "credits": ("type", {"ACTED_IN": LOAD_ACTED_IN, "DIRECTED": LOAD_DIRECTED}),
+    "users": (None, {None: LOAD_USERS}),
+    "ratings": (None, {None: LOAD_RATINGS}),
+}
+
+# Conversions des colonnes CSV (tout est texte dans un CSV)
+CSV_TYPES = {"year": int, "rating": float, "age": int}
+CSV_LISTS = {"genres"}
+
+
+def _convert_csv_row(row: dict) -> dict:
+    converted = {}
+    for key, value in row.items():
+        if value == "":
+            converted[key] = [] if key in CSV_LISTS else None
+        elif key in CSV_LISTS:
+            converted[key] = value.split("|")
+        else:
+            converted[key] = CSV_TYPES.get(key, str)(value)
+    return converted
+
+
+def read_rows(path: Path):
+    """Stream the rows of a JSONL or CSV file (optionally gzipped) one at a time"""
+    path = Path(path)
+    compressed = path.suffix == ".gz"
+    opener = gzip.open if compressed else open
+    with opener(path, "rt", newline="", encoding="utf-8") as f:
+        if Path(path.stem if compressed else path.name).suffix == ".csv":
+            for row in csv.DictReader(f):
+                yield _convert_csv_row(row)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def batches(rows, batch_size: int):
+    """Group an iterator of rows into lists of at most batch_size rows"""
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        yield batch
+
+
+def find_dataset(directory: Path, name: str) -> Path | None:
+    for suffix in (".jsonl", ".csv", ".jsonl.gz", ".csv.gz"):
+        path = directory / f"{name}{suffix}"
+        if path.exists():
+            return path
+    return None
+
+
+def _write_batch(tx, statements: dict, route: str | None, batch: list[dict]):
+    groups = {}
+    for row in batch:
+        groups.setdefault(row.get(route) if route else None, []).append(row)
+    for key, rows in groups.items():
+        if key not in statements:
+            raise ValueError(f"Unknown {route} '{key}'")
+        tx.run(statements[key], rows=rows).consume()
+
+
+def load_dataset(driver, path: Path, name: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                 database: str | None = None) -> int:
+    """Load one file in batches of UNWIND writes and return the number of rows"""
+    route, statements = DATASETS[name]
+    count = 0
+    with driver.session(database=database) as session:
+        for batch in batches(read_rows(path), batch_size):
+            session.execute_write(_write_batch, statements, route, batch)
+            count += len(batch)
+    return count
+
+
+def load_directory(driver, directory, batch_size: int = DEFAULT_BATCH_SIZE,
+                   database: str | None = None) -> dict[str, int]:
+    """Load every dataset found in a directory and report the throughput"""
+    directory = Path(directory)
+    counts = {}
+    total_start = time.perf_counter()
+    for name in DATASETS:
+        path = find_dataset(directory, name)
+        if path is None:
+            continue
+        start = time.perf_counter()
+        counts[name] = load_dataset(driver, path, name, batch_size, database)
+        elapsed = time.perf_counter() - start
+        print(f"  📥 {name}: {counts[name]} lignes en {elapsed:.2f} s "
+              f"({counts[name] / elapsed if elapsed else 0:.0f} lignes/s)")
+    elapsed = time.perf_counter() - total_start
+    total = sum(counts.values())
+    print(f"  ⏱️ Total: {total} lignes en {elapsed:.2f} s ({total / elapsed if elapsed else 0:.0f} lignes/s)")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load a movie catalog into Neo4j")
+    parser.add_argument("directory", help="Directory containing the JSONL/CSV files")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Rows per write transaction (default {DEFAULT_BATCH_SIZE})")
+    args = parser.parse_args()
+
+    load_dotenv()
+    driver = GraphDatabase.driver(
+        os.getenv("NEO4J_URI"),
+        auth=(os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD"))
+    )
+    database = os.getenv("NEO4J_DATABASE") or None
+    try:
+        # Les contraintes indexent les clés utilisées par les MERGE
+        apply_schema(driver, database)
+        print(f"📦 Import de {args.directory} (lots de {args.batch_size})...")
+        load_directory(driver, args.directory, args.batch_size, database)
+    finally:
+        driver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Métriques du serveur : durée de chaque phase des outils, lignes et db hits.
+
+Les durées sont agrégées dans des histogrammes en mémoire, exposés par
+l'outil server_stats (texte ou format Prometheus). Un journal des requêtes
+lentes est disponible en option (SLOW_QUERY_MS).
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+# Seuil du journal des requêtes lentes, en ms (désactivé si absent)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS")) if os.getenv("SLOW_QUERY_MS") else None
+# Exécuter les requêtes du catalogue sous PROFILE pour compter les db hits
+METRICS_PROFILE = os.getenv("METRICS_PROFILE", "").lower() in ("1", "true", "yes")
+
+# Outil en cours d'exécution, pour attribuer les requêtes Neo4j
+current_tool: ContextVar[str] = ContextVar("current_tool", default="unknown")
+
+# Bornes des seaux des histogrammes, en ms
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def label_value(value: str) -> str:
+    """Escape a Prometheus label value"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """Fixed-bucket latency histogram"""
+
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value_ms: float):
+        for i, bound in enumerate(BUCKETS_MS):
+            if value_ms <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.total += value_ms
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else float("inf")
+        return float("inf")
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+def sum_db_hits(profile) -> int:
+    """Sum the DB hits of a PROFILE operator tree"""
+    if not profile:
+        return 0
+    return profile.get("dbHits", 0) + sum(sum_db_hits(child) for child in profile.get("children", []))
+
+
+class Metrics:
+    """Per-tool phase histograms and row / DB-hit counters"""
+
+    def __init__(self):
+        # (outil, phase) -> histogramme
+        self.histograms: dict[tuple[str, str], Histogram] = {}
+        # (outil, compteur) -> valeur
+        self.counters: dict[tuple[str, str], int] = {}
+
+    def observe(self, tool: str, phase: str, value_ms: float):
+        histogram = self.histograms.get((tool, phase))
+        if histogram is None:
+            histogram = self.histograms[tool, phase] = Histogram()
+        histogram.observe(value_ms)
+
+    def increment(self, tool: str, counter: str, value: int = 1):
+        self.counters[tool, counter] = self.counters.get((tool, counter), 0) + value
+
+    @contextmanager
+    def span(self, tool: str, phase: str):
+        """Time a block of code as one phase of a tool call"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(tool, phase, (time.perf_counter() - start) * 1000)
+
+    def record_query(self, query: str, params: dict | None, rows: int, elapsed_ms: float, summary):
+        """Record a finished Neo4j query: rows, server timings, DB hits and slow-query log"""
+        tool = current_tool.get()
+        self.increment(tool, "queries")
+        self.increment(tool, "rows", rows)
+        if summary is not None:
+            if summary.result_available_after is not None:
+                self.observe(tool, "server_available", summary.result_available_after)
+            if summary.result_consumed_after is not None:
+                self.observe(tool, "server_consumed", summary.result_consumed_after)
+            if summary.profile:
+                self.increment(tool, "db_hits", sum_db_hits(summary.profile))
+        if SLOW_QUERY_MS is not None and elapsed_ms >= SLOW_QUERY_MS:
+            logger.warning("Slow query for %s (%.1f ms, %d rows): %s params=%r",
+                           tool, elapsed_ms, rows, " ".join(query.split()), params)
+
+    def tools(self) -> list[str]:
+        return sorted({tool for tool, _ in self.histograms} | {tool for tool, _ in self.counters})
+
+    def snapshot(self) -> dict:
+        """Per-tool call count, latency quantiles, mean phase durations and counters"""
+        snapshot = {}
+        for tool in self.tools():
+            total = self.histograms.get((tool, "total"))
+            snapshot[tool] = {
+                "calls": total.count if total else 0,
+                "p50_ms": total.quantile(0.5) if total else None,
+                "p95_ms": total.quantile(0.95) if total else None,
+                "p99_ms": total.quantile(0.99) if total else None,
+                "phases_ms": {
+                    phase: histogram.mean
+                    for (t, phase), histogram in sorted(self.histograms.items())
+                    if t == tool and phase != "total"
+                },
+                "counters": {name: value for (t, name), value in sorted(self.counters.items()) if t == tool},
+            }
+        return snapshot
+
+    def render_text(self) -> str:
+        lines = []
+        for tool in self.tools():
+            total = self.histograms.get((tool, "total"))
+            header = f"{tool}: {total.count if total else 0} calls"
+            if total:
+                header += (f", p50 {total.quantile(0.5):g} ms, p95 {total.quantile(0.95):g} ms, "
+                           f"p99 {total.quantile(0.99):g} ms")
+            lines.append(header)
+            phases = [
+                f"{phase} {histogram.mean:.2f} ms"
+                for (t, phase), histogram in sorted(self.histograms.items())
+                if t == tool and phase != "total"
+            ]
+            if phases:
+                lines.append("  mean per phase: " + ", ".join(phases))
+            counters = [f"{name} {value}" for (t, name), value in sorted(self.counters.items()) if t == tool]
+            if counters:
+                lines.append("  " + ", ".join(counters))
+        return "\n".join(lines) if lines else "No tool calls yet"
+
+    def render_prometheus(self) -> str:
+        """Histograms and counters in the Prometheus text exposition format"""
+        lines = [
+            "# HELP mcp_tool_phase_ms Duration of each phase of a tool call in milliseconds",
+            "# TYPE mcp_tool_phase_ms histogram",
+        ]
+        for (tool, phase), histogram in sorted(self.histograms.items()):
+            labels = f'tool="{label_value(tool)}",phase="{label_value(phase)}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS_MS, histogram.counts):
+                cumulative += count
+                lines.append(f'mcp_tool_phase_ms_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'mcp_tool_phase_ms_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"mcp_tool_phase_ms_sum{{{labels}}} {histogram.total}")
+            lines.append(f"mcp_tool_phase_ms_count{{{labels}}} {histogram.count}")
+        lines += [
+            "# HELP mcp_tool_total Per-tool counters (queries, rows, db_hits)",
+            "# TYPE mcp_tool_total counter",
+        ]
+        for (tool, counter), value in sorted(self.counters.items()):
+            lines.append(f'mcp_tool_total{{tool="{label_value(tool)}",counter="{label_value(counter)}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
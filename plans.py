@@ -0,0 +1,238 @@
+"""Contrôle des plans d'exécution des requêtes du catalogue.
+
+Chaque requête utilisée par les outils MCP est passée sous PROFILE (ou
+EXPLAIN) avec des paramètres de référence. L'arbre des opérateurs, les
+lignes estimées et les db hits sont comparés à une référence enregistrée
+en JSON. La commande échoue si un plan contient un opérateur interdit
+(AllNodesScan, CartesianProduct...) ou si les db hits d'une requête
+dépassent ceux de la référence de plus de --threshold. Les requêtes
+d'écriture (EXPLAIN_ONLY) ne sont jamais exécutées. Tant qu'aucune
+référence n'est enregistrée, seuls les opérateurs interdits sont contrôlés.
+
+    python plans.py --data data/demo            # charge le jeu de référence puis contrôle
+    python plans.py --data data/demo --update   # enregistre la nouvelle référence
+    python plans.py --explain                   # plans estimés, sans exécuter les requêtes
+
+Sans Neo4j, StubPlanProvider rejoue des plans enregistrés (tests, CI).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+from neo4j import GraphDatabase
+from dotenv import load_dotenv
+
+import queries
+from collaborative import EXPORT_RATINGS
+from loader import load_directory
+from pagerank import EXPORT_GRAPH
+from schema import apply_schema
+
+DEFAULT_BASELINE = Path(__file__).parent / "plans_baseline.json"
+
+# Opérateurs refusés dans tout plan du catalogue
+FORBIDDEN_OPERATORS = ("AllNodesScan", "CartesianProduct")
+
+# Hausse tolérée des db hits par rapport à la référence, et écart absolu ignoré
+DEFAULT_THRESHOLD = 0.2
+MIN_DB_HITS_DELTA = 10
+
+# Noms du jeu de démonstration (data/demo) utilisés comme paramètres de référence
+REFERENCE = {"user_name": "Alice", "title": "Inception", "genre": "Action", "actor": "Bale", "director": "Nolan"}
+
+
+def _search(arguments: dict) -> tuple[str, dict]:
+    query, _, params = queries.search_movies_query(arguments)
+    return query, params
+
+
+def _count(arguments: dict) -> tuple[str, dict]:
+    _, count_query, params = queries.search_movies_query(arguments)
+    return count_query, params
+
+
+# Requête du catalogue -> (texte, paramètres de référence)
+CATALOG = {
+    "search_movies": _search({}),
+    "search_movies_genre_rating": _search({"genre": REFERENCE["genre"], "min_rating": 8}),
+    "search_movies_actor_director": _search({"actor": REFERENCE["actor"], "director": REFERENCE["director"]}),
+    "search_movies_query_genre": _search({"query": "dark knight", "genre": REFERENCE["genre"]}),
+    "count_movies_genre_actor": _count({"genre": REFERENCE["genre"], "actor": REFERENCE["actor"]}),
+    "get_user_preferences": (queries.GET_USER_PREFERENCES, {"user_name": REFERENCE["user_name"]}),
+    "recommend_similar": (queries.RECOMMEND_SIMILAR, {"user_name": REFERENCE["user_name"]}),
+    "recommend_movies": (queries.RECOMMEND_MOVIES, {"user_name": REFERENCE["user_name"]}),
+    "recommend_similar_batch": (queries.RECOMMEND_SIMILAR_BATCH, {"keys": [REFERENCE["user_name"], "Bob"]}),
+    "recommend_movies_batch": (queries.RECOMMEND_MOVIES_BATCH, {"keys": [REFERENCE["user_name"], "Bob"]}),
+    "recommended_details": (queries.RECOMMENDED_DETAILS, {"titles": [REFERENCE["title"], "The Matrix"]}),
+    "get_movie_details": (queries.GET_MOVIE_DETAILS, {"title": REFERENCE["title"]}),
+    "get_movie_details_batch": (queries.GET_MOVIE_DETAILS_BATCH, {"keys": [REFERENCE["title"], "The Matrix"]}),
+    "fuzzy_movie_title": (queries.FUZZY_MOVIE_TITLE,
+                          {"query": queries.fulltext_query("incepton", field="title", require_all=False)}),
+    "export_ratings": (EXPORT_RATINGS, {}),
+    "export_graph": (EXPORT_GRAPH, {}),
+    "rate_movies": (queries.RATE_MOVIES, {"rows": [{"user": REFERENCE["user_name"], "title": REFERENCE["title"],
+                                                    "rating": 5}]}),
+}
+
+# Requêtes d'écriture : toujours sous EXPLAIN, PROFILE les exécuterait
+EXPLAIN_ONLY = {"rate_movies"}
+
+
+def query_hash(query: str) -> str:
+    """Fingerprint of a query text, to tell a changed query from a changed plan"""
+    return hashlib.sha256(" ".join(query.split()).encode()).hexdigest()[:16]
+
+
+def normalize_plan(plan: dict) -> dict:
+    """Keep the stable parts of a Neo4j plan or profile tree"""
+    arguments = plan.get("args") or plan.get("arguments") or {}
+    return {
+        "operator": plan["operatorType"].split("@")[0],
+        "details": arguments.get("Details"),
+        "estimated_rows": arguments.get("EstimatedRows"),
+        "db_hits": plan.get("dbHits"),
+        "rows": plan.get("rows"),
+        "children": [normalize_plan(child) for child in plan.get("children", [])],
+    }
+
+
+def operators(tree: dict) -> list[str]:
+    return [tree["operator"]] + [op for child in tree["children"] for op in operators(child)]
+
+
+def total_db_hits(tree: dict) -> int | None:
+    """Sum of the DB hits of a profiled tree (None for an EXPLAIN plan)"""
+    if tree["db_hits"] is None:
+        return None
+    return tree["db_hits"] + sum(total_db_hits(child) or 0 for child in tree["children"])
+
+
+class Neo4jPlanProvider:
+    """Plans from a live Neo4j, under PROFILE (executes the query) or EXPLAIN"""
+
+    def __init__(self, driver, database: str | None = None):
+        self.driver = driver
+        self.database = database
+
+    def plan(self, name: str, query: str, params: dict, profile: bool) -> dict:
+        with self.driver.session(database=self.database) as session:
+            summary = session.run(("PROFILE " if profile else "EXPLAIN ") + query, params).consume()
+        return normalize_plan(summary.profile if profile else summary.plan)
+
+
+class StubPlanProvider:
+    """Replay recorded plans, keyed by catalog query name"""
+
+    def __init__(self, plans: dict[str, dict]):
+        self.plans = plans
+
+    @classmethod
+    def from_baseline(cls, path) -> "StubPlanProvider":
+        baseline = json.loads(Path(path).read_text())
+        return cls({name: entry["plan"] for name, entry in baseline["queries"].items()})
+
+    def plan(self, name: str, query: str, params: dict, profile: bool) -> dict:
+        return self.plans[name]
+
+
+def record(provider, catalog: dict = CATALOG, profile: bool = True) -> dict:
+    """Plan every catalog query and return a baseline document (write queries are only explained)"""
+    entries = {}
+    for name, (query, params) in catalog.items():
+        tree = provider.plan(name, query, params, profile and name not in EXPLAIN_ONLY)
+        entries[name] = {
+            "query_hash": query_hash(query),
+            "params": params,
+            "db_hits": total_db_hits(tree),
+            "estimated_rows": tree["estimated_rows"],
+            "operators": operators(tree),
+            "plan": tree,
+        }
+    return {"profile": profile, "queries": entries}
+
+
+def compare(current: dict, baseline: dict | None, threshold: float = DEFAULT_THRESHOLD) -> list[str]:
+    """List the failures of the current plans: forbidden operators and DB-hit regressions"""
+    failures = []
+    for name, entry in current["queries"].items():
+        forbidden = sorted(set(entry["operators"]) & set(FORBIDDEN_OPERATORS))
+        if forbidden:
+            failures.append(f"{name}: forbidden operator(s) {', '.join(forbidden)}")
+        reference = (baseline or {}).get("queries", {}).get(name)
+        if reference is None:
+            # Sans référence, la requête ne serait jamais contrôlée
+            failures.append(f"{name}: not in the baseline (record it with --update)")
+            continue
+        if entry["db_hits"] is None or reference["db_hits"] is None:
+            continue
+        limit = reference["db_hits"] * (1 + threshold)
+        if entry["db_hits"] > limit and entry["db_hits"] - reference["db_hits"] > MIN_DB_HITS_DELTA:
+            changed = " (query text changed)" if entry["query_hash"] != reference["query_hash"] else ""
+            failures.append(f"{name}: {entry['db_hits']} db hits, baseline {reference['db_hits']} "
+                            f"(+{threshold:.0%} allowed){changed}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the catalog queries and check their plans")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Baseline JSON file")
+    parser.add_argument("--update", action="store_true", help="Write the current plans as the new baseline")
+    parser.add_argument("--explain", action="store_true", help="Use EXPLAIN (estimates only, no db hits)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Tolerated DB-hit increase over the baseline (default 0.2 = 20%%)")
+    parser.add_argument("--data", help="Load this loader-format directory (MERGE) before profiling")
+    parser.add_argument("--stub", help="Replay the plans recorded in this baseline instead of using Neo4j")
+    args = parser.parse_args()
+
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else None
+
+    if args.stub and not Path(args.stub).exists():
+        print(f"⚠️ Contrôle des plans pas encore activé : aucun plan enregistré dans {args.stub}")
+        return
+    if args.stub:
+        current = record(StubPlanProvider.from_baseline(args.stub), profile=not args.explain)
+    else:
+        load_dotenv()
+        driver = GraphDatabase.driver(
+            os.getenv("NEO4J_URI"),
+            auth=(os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD"))
+        )
+        database = os.getenv("NEO4J_DATABASE") or None
+        try:
+            if args.data:
+                apply_schema(driver, database)
+                load_directory(driver, args.data, database=database)
+                with driver.session(database=database) as session:
+                    session.run("CALL db.awaitIndexes(300)").consume()
+            current = record(Neo4jPlanProvider(driver, database), profile=not args.explain)
+        finally:
+            driver.close()
+
+    for name, entry in current["queries"].items():
+        reference = (baseline or {}).get("queries", {}).get(name, {})
+        print(f"  {name:30} {entry['db_hits'] if entry['db_hits'] is not None else '-':>8} db hits "
+              f"(baseline {reference.get('db_hits', '-')})  {' > '.join(entry['operators'])}")
+
+    # Une nouvelle référence, ou son absence, ne contrôle que les opérateurs interdits
+    failures = compare(current, current if args.update or baseline is None else baseline, args.threshold)
+    if args.update:
+        baseline_path.write_text(json.dumps(current, indent=2))
+        print(f"\n📝 Référence écrite dans {baseline_path}")
+    elif baseline is None:
+        print(f"\n⚠️ Contrôle des db hits pas encore activé : aucune référence dans {baseline_path}, "
+              f"enregistrez-la avec --data data/demo --update")
+    if failures:
+        print("\n❌ Plans en régression :")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\n✅ Aucun opérateur interdit, aucune régression de db hits")
+
+
+if __name__ == "__main__":
+    main()
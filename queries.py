@@ -0,0 +1,280 @@
+"""Catalogue des requêtes Cypher utilisées par les outils MCP.
+
+Chaque requête est un texte fixe et paramétré ($params) : Neo4j peut ainsi
+réutiliser le plan mis en cache au lieu de re-planifier chaque appel.
+"""
+
+import re
+from itertools import combinations
+
+# Filtres acceptés par search_movies, dans l'ordre canonique
+SEARCH_FILTERS = ("query", "genre", "actor", "director", "min_rating")
+
+# Filtres texte résolus par les index plein texte (schema.py)
+FULLTEXT_FILTERS = ("query", "actor", "director")
+
+# Personnes trouvées par l'index plein texte, collectées en une seule ligne ({imports} :
+# la recherche précédente, pour que la sous-requête soit corrélée et non un CartesianProduct)
+PERSON_LOOKUPS = {
+    "actor": "CALL {{ {imports}CALL db.index.fulltext.queryNodes('person_fulltext', $actor) YIELD node "
+             "WHERE node:Actor RETURN collect(node) as actors }}",
+    "director": "CALL {{ {imports}CALL db.index.fulltext.queryNodes('person_fulltext', $director) YIELD node "
+                "WHERE node:Director RETURN collect(node) as directors }}",
+}
+PERSON_LISTS = {"actor": "actors", "director": "directors"}
+
+# Source des films, par ordre de préférence : le premier filtre actif ancre la recherche.
+# Après une recherche de personnes, l'ancre doit partir de ses résultats (ou d'un appel
+# de procédure) : un MATCH indépendant serait planifié en CartesianProduct.
+SEARCH_ANCHORS = {
+    "query": "CALL db.index.fulltext.queryNodes('movie_fulltext', $query) YIELD node as m, score",
+    "actor": "UNWIND actors as a MATCH (a)-[:ACTED_IN]->(m:Movie)",
+    "director": "UNWIND directors as d MATCH (d)-[:DIRECTED]->(m:Movie)",
+    "genre": "MATCH (:Genre {name: $genre})<-[:HAS_GENRE]-(m:Movie)",
+}
+
+# Les autres filtres actifs deviennent des prédicats sur m
+SEARCH_PREDICATES = {
+    "genre": "(m)-[:HAS_GENRE]->(:Genre {name: $genre})",
+    "actor": "EXISTS { MATCH (m)<-[:ACTED_IN]-(a) WHERE a IN actors }",
+    "director": "EXISTS { MATCH (m)<-[:DIRECTED]-(d) WHERE d IN directors }",
+    "min_rating": "m.rating >= $min_rating",
+}
+
+# Pagination par défaut et plafond de search_movies
+SEARCH_DEFAULT_LIMIT = 5
+SEARCH_MAX_LIMIT = 50
+
+
+def fulltext_terms(text: str) -> list[str]:
+    """Lowercase word terms of a free-text search"""
+    return re.findall(r"\w+", text.lower())
+
+
+def max_edits(term: str) -> int:
+    """Edit distance tolerated for a term: none for short terms, up to 2 for long ones"""
+    return 0 if len(term) <= 2 else 1 if len(term) <= 5 else 2
+
+
+def fulltext_query(text: str, field: str | None = None, require_all: bool = True) -> str:
+    """Build a Lucene query matching each term as a prefix or within a few edits
+
+    With require_all, every term must match; otherwise hits are ranked by
+    how many terms they match.
+    """
+    prefix = f"{field}:" if field else ""
+    required = "+" if require_all else ""
+    clauses = []
+    for term in fulltext_terms(text):
+        edits = max_edits(term)
+        if edits:
+            clauses.append(f"{required}({prefix}{term}* {prefix}{term}~{edits})")
+        else:
+            clauses.append(f"{required}{prefix}{term}*")
+    return " ".join(clauses)
+
+
+def _search_movies_match(filters: tuple[str, ...]) -> str:
+    """Build the clauses narrowing the movie set, shared by the search and count templates
+
+    Actor and director names are looked up once in the full-text index, the
+    second lookup importing the first so each clause builds on the previous
+    one (no CartesianProduct). The first active filter of SEARCH_ANCHORS
+    anchors the MATCH so only matching movies are ever expanded, and the
+    others are checked on each of them.
+    """
+    clauses, imported = [], []
+    for f in filters:
+        if f in PERSON_LOOKUPS:
+            clauses.append(PERSON_LOOKUPS[f].format(imports=f"WITH {', '.join(imported)} " if imported else ""))
+            imported.append(PERSON_LISTS[f])
+    anchor = next((f for f in SEARCH_ANCHORS if f in filters), None)
+    clauses.append(SEARCH_ANCHORS[anchor] if anchor else "MATCH (m:Movie)")
+    predicates = [SEARCH_PREDICATES[f] for f in filters if f in SEARCH_PREDICATES and f != anchor]
+    if predicates:
+        clauses.append("WHERE " + " AND ".join(predicates))
+    clauses.append("WITH DISTINCT m, score" if "query" in filters else "WITH DISTINCT m")
+    return "\n" + "".join(f"        {clause}\n" for clause in clauses)
+
+
+def _build_search_movies(filters: tuple[str, ...]) -> str:
+    """Build the search_movies template for one combination of filters"""
+    # Avec une recherche texte, les films sont classés par pertinence
+    order = "score DESC, m.rating DESC, m.title" if "query" in filters else "m.rating DESC, m.title"
+    return _search_movies_match(filters) + f"""\
+        WITH m{", score" if "query" in filters else ""}
+        ORDER BY {order}
+        SKIP $offset
+        LIMIT $limit
+        RETURN m.title as title,
+               m.year as year,
+               m.rating as rating,
+               m.description as description,
+               [(m)<-[:ACTED_IN]-(a:Actor) | a.name] as actors,
+               [(m)<-[:DIRECTED]-(d:Director) | d.name] as directors,
+               [(m)-[:HAS_GENRE]->(g:Genre) | g.name] as genres{", score" if "query" in filters else ""}
+        ORDER BY {"score DESC, " if "query" in filters else ""}rating DESC, title
+        """
+
+
+def _build_count_movies(filters: tuple[str, ...]) -> str:
+    """Build the template counting every match of one combination of filters"""
+    return _search_movies_match(filters) + """\
+        RETURN count(m) as total
+        """
+
+
+# Une requête par combinaison de filtres (2^5 = 32 textes au maximum)
+_SEARCH_COMBINATIONS = [
+    filters
+    for size in range(len(SEARCH_FILTERS) + 1)
+    for filters in combinations(SEARCH_FILTERS, size)
+]
+SEARCH_MOVIES = {filters: _build_search_movies(filters) for filters in _SEARCH_COMBINATIONS}
+COUNT_MOVIES = {filters: _build_count_movies(filters) for filters in _SEARCH_COMBINATIONS}
+
+
+def search_page(arguments: dict) -> tuple[dict, int, int]:
+    """Extract the active filters and the clamped limit/offset from search_movies arguments"""
+    filters = {
+        f: arguments[f] for f in SEARCH_FILTERS
+        if arguments.get(f) and (f not in FULLTEXT_FILTERS or fulltext_terms(str(arguments[f])))
+    }
+    limit = max(1, min(int(arguments.get("limit") or SEARCH_DEFAULT_LIMIT), SEARCH_MAX_LIMIT))
+    offset = max(0, int(arguments.get("offset") or 0))
+    return filters, limit, offset
+
+
+def search_movies_query(arguments: dict) -> tuple[str, str, dict]:
+    """Pick the search and count templates and their parameters for the given arguments"""
+    filters, limit, offset = search_page(arguments)
+    key = tuple(filters)
+    params = {f: fulltext_query(value) if f in FULLTEXT_FILTERS else value for f, value in filters.items()}
+    return SEARCH_MOVIES[key], COUNT_MOVIES[key], {**params, "limit": limit, "offset": offset}
+
+
+GET_USER_PREFERENCES = """
+        MATCH (u:User {name: $user_name})-[l:LIKES]->(m:Movie)
+        OPTIONAL MATCH (m)-[:HAS_GENRE]->(g:Genre)
+        RETURN m.title as title,
+               l.rating as rating,
+               m.year as year,
+               m.description as description,
+               collect(DISTINCT g.name) as genres
+        ORDER BY l.rating DESC
+        """
+
+# Recommande les voisins pré-calculés (SIMILAR) des films aimés, pondérés par la note
+RECOMMEND_SIMILAR = """
+        MATCH (u:User {name: $user_name})-[l:LIKES]->(liked:Movie)-[s:SIMILAR]->(recommended:Movie)
+        WHERE NOT (u)-[:LIKES]->(recommended)
+        WITH recommended, sum(s.score * l.rating) as score, collect(DISTINCT liked.title) as similar_to
+        ORDER BY score DESC, recommended.rating DESC
+        LIMIT 5
+        RETURN recommended.title as title,
+               recommended.rating as rating,
+               recommended.year as year,
+               recommended.description as description,
+               similar_to,
+               score,
+               [(recommended)<-[:ACTED_IN]-(a:Actor) | a.name] as actors,
+               [(recommended)<-[:DIRECTED]-(d:Director) | d.name] as directors
+        ORDER BY score DESC, rating DESC
+        """
+
+# Recommande des films selon les genres partagés avec les films aimés
+# (repli quand l'index SIMILAR n'a pas encore été calculé)
+RECOMMEND_MOVIES = """
+        MATCH (u:User {name: $user_name})-[:LIKES]->(liked:Movie)-[:HAS_GENRE]->(g:Genre)
+        <-[:HAS_GENRE]-(recommended:Movie)
+        WHERE NOT (u)-[:LIKES]->(recommended)
+        WITH recommended, collect(DISTINCT g.name) as shared_genres, count(DISTINCT g) as genre_match_count
+        OPTIONAL MATCH (recommended)<-[:ACTED_IN]-(a:Actor)
+        OPTIONAL MATCH (recommended)<-[:DIRECTED]-(d:Director)
+        RETURN DISTINCT recommended.title as title,
+               recommended.rating as rating,
+               recommended.year as year,
+               recommended.description as description,
+               shared_genres,
+               genre_match_count,
+               collect(DISTINCT a.name) as actors,
+               collect(DISTINCT d.name) as directors
+        ORDER BY genre_match_count DESC, recommended.rating DESC
+        LIMIT 5
+        """
+
+# Détails des films recommandés par un moteur en mémoire, dans l'ordre donné
+RECOMMENDED_DETAILS = """
+        UNWIND range(0, size($titles) - 1) AS i
+        MATCH (recommended:Movie {title: $titles[i]})
+        RETURN recommended.title as title,
+               recommended.rating as rating,
+               recommended.year as year,
+               recommended.description as description,
+               [(recommended)<-[:ACTED_IN]-(a:Actor) | a.name] as actors,
+               [(recommended)<-[:DIRECTED]-(d:Director) | d.name] as directors
+        ORDER BY i
+        """
+
+GET_MOVIE_DETAILS = """
+        MATCH (m:Movie {title: $title})
+        OPTIONAL MATCH (m)<-[:ACTED_IN]-(a:Actor)
+        OPTIONAL MATCH (m)<-[:DIRECTED]-(d:Director)
+        OPTIONAL MATCH (m)-[:HAS_GENRE]->(g:Genre)
+        OPTIONAL MATCH (u:User)-[l:LIKES]->(m)
+        RETURN m.title as title,
+               m.year as year,
+               m.rating as rating,
+               m.description as description,
+               collect(DISTINCT a.name) as actors,
+               collect(DISTINCT d.name) as directors,
+               collect(DISTINCT g.name) as genres,
+               collect(DISTINCT {user: u.name, rating: l.rating}) as user_ratings
+        """
+
+# Meilleur titre approchant, quand get_movie_details ne trouve pas le titre exact
+FUZZY_MOVIE_TITLE = """
+        CALL db.index.fulltext.queryNodes('movie_fulltext', $query) YIELD node, score
+        RETURN node.title as title, score
+        ORDER BY score DESC, node.rating DESC
+        LIMIT 1
+        """
+
+# Écrit un lot de notes (rate_movie) : les films notés et les autres films
+# aimés par ces utilisateurs sont à recalculer dans l'index SIMILAR
+RATE_MOVIES = """
+        UNWIND $rows AS row
+        MATCH (m:Movie {title: row.title})
+        MERGE (u:User {name: row.user})
+        MERGE (u)-[l:LIKES]->(m)
+        SET l.rating = row.rating
+        WITH collect(DISTINCT u) as users, count(*) as written
+        CALL {
+        WITH users
+        UNWIND users AS u
+        MATCH (u)-[:LIKES]->(liked:Movie)
+        SET liked.similarity_stale = true
+        }
+        RETURN written
+        """
+
+
+def batch_query(query: str, param: str) -> str:
+    """Turn a single-key template into one running it for every key of $keys
+
+    Each key is bound to the variable `key` in place of the $param parameter,
+    and its rows come back with a `key` column.
+    """
+    return f"""
+        UNWIND $keys AS key
+        CALL {{
+        WITH key
+        {query.replace("$" + param, "key").strip()}
+        }}
+        RETURN *
+        """
+
+
+RECOMMEND_SIMILAR_BATCH = batch_query(RECOMMEND_SIMILAR, "user_name")
+RECOMMEND_MOVIES_BATCH = batch_query(RECOMMEND_MOVIES, "user_name")
+GET_MOVIE_DETAILS_BATCH = batch_query(GET_MOVIE_DETAILS, "title")
@@ -0,0 +1,121 @@
+"""Tampon d'écriture des notes reçues par les outils rate_movie / rate_movies.
+
+Les notes sont gardées en mémoire (la dernière note d'un couple
+utilisateur/film l'emporte) puis écrites par lots, dans des transactions
+UNWIND ... MERGE :
+
+- dès que RATING_FLUSH_SIZE notes sont en attente,
+- au plus tard RATING_FLUSH_INTERVAL secondes après leur arrivée,
+- à l'arrêt du serveur (close).
+
+Quand le tampon est plein, l'appelant attend la fin d'un flush
+(contre-pression) au lieu de faire grossir la mémoire.
+"""
+
+import asyncio
+import logging
+import time
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Outil auquel sont attribuées les métriques des flushs
+METRICS_TOOL = "ratings"
+
+
+class RatingBuffer:
+    """Buffer ratings in memory and write them in batches"""
+
+    def __init__(self, write, on_flush=None, flush_size: int = 100, flush_interval: float = 5.0,
+                 max_pending: int = 1000):
+        # write(rows) -> nombre de notes écrites ; on_flush(rows) après chaque lot écrit
+        self.write = write
+        self.on_flush = on_flush
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        # (utilisateur, titre) -> note, dans l'ordre d'arrivée
+        self.pending: dict[tuple[str, str], float] = {}
+        self._flush_lock = asyncio.Lock()
+        self._timer = None
+        self._background = set()
+        self.flushed = 0
+        self.skipped = 0
+        self.backpressure_waits = 0
+
+    def start(self):
+        """Start the periodic flush"""
+        if self._timer is None:
+            self._timer = asyncio.create_task(self._flush_periodically())
+
+    async def add(self, ratings: list[dict]) -> int:
+        """Queue {user, title, rating} rows, waiting for a flush while the buffer is full"""
+        for row in ratings:
+            key = (row["user"], row["title"])
+            while key not in self.pending and len(self.pending) >= self.max_pending:
+                self.backpressure_waits += 1
+                await self.flush()
+            self.pending[key] = row["rating"]
+        metrics.increment(METRICS_TOOL, "buffered", len(ratings))
+        if len(self.pending) >= self.flush_size:
+            self._flush_in_background()
+        return len(self.pending)
+
+    async def flush(self) -> int:
+        """Write every pending rating, one transaction per flush_size rows"""
+        async with self._flush_lock:
+            written = 0
+            while self.pending:
+                keys = list(self.pending)[:self.flush_size]
+                rows = [{"user": user, "title": title, "rating": self.pending[user, title]} for user, title in keys]
+                start = time.perf_counter()
+                count = await self.write(rows)
+                metrics.observe(METRICS_TOOL, "flush", (time.perf_counter() - start) * 1000)
+                # Une note plus récente arrivée pendant l'écriture reste en attente
+                for key, row in zip(keys, rows):
+                    if self.pending.get(key) == row["rating"]:
+                        del self.pending[key]
+                written += count
+                self.flushed += count
+                self.skipped += len(rows) - count
+                metrics.increment(METRICS_TOOL, "flushed", count)
+                if self.on_flush is not None:
+                    self.on_flush(rows)
+            return written
+
+    def _flush_in_background(self):
+        task = asyncio.create_task(self._flush_logged())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _flush_logged(self):
+        try:
+            await self.flush()
+        except Exception:
+            # Les notes restent en attente : le prochain flush les réessaie
+            logger.exception("Rating flush failed, %d ratings still pending", len(self.pending))
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self.pending:
+                await self._flush_logged()
+
+    async def close(self):
+        """Stop the periodic flush and write what is still pending"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self.pending),
+            "max_pending": self.max_pending,
+            "flushed": self.flushed,
+            "skipped": self.skipped,
+            "backpressure_waits": self.backpressure_waits,
+        }
@@ -0,0 +1,67 @@
+"""Contraintes et index du graphe de films.
+
+Les instructions sont idempotentes (IF NOT EXISTS) : elles sont rejouées à
+chaque setup et à chaque démarrage du serveur.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Nom de l'index -> instruction qui le crée
+SCHEMA_STATEMENTS = {
+    # Unicité des clés de recherche (crée aussi l'index qui les sert)
+    "movie_title": "CREATE CONSTRAINT movie_title IF NOT EXISTS FOR (m:Movie) REQUIRE m.title IS UNIQUE",
+    "user_name": "CREATE CONSTRAINT user_name IF NOT EXISTS FOR (u:User) REQUIRE u.name IS UNIQUE",
+    "genre_name": "CREATE CONSTRAINT genre_name IF NOT EXISTS FOR (g:Genre) REQUIRE g.name IS UNIQUE",
+    "actor_name": "CREATE CONSTRAINT actor_name IF NOT EXISTS FOR (a:Actor) REQUIRE a.name IS UNIQUE",
+    "director_name": "CREATE CONSTRAINT director_name IF NOT EXISTS FOR (d:Director) REQUIRE d.name IS UNIQUE",
+    # Filtre et tri sur la note
+    "movie_rating": "CREATE RANGE INDEX movie_rating IF NOT EXISTS FOR (m:Movie) ON (m.rating)",
+    # Recherche plein texte (insensible à la casse, approchante) des films et des personnes
+    "movie_fulltext": "CREATE FULLTEXT INDEX movie_fulltext IF NOT EXISTS "
+                      "FOR (m:Movie) ON EACH [m.title, m.description]",
+    "person_fulltext": "CREATE FULLTEXT INDEX person_fulltext IF NOT EXISTS "
+                       "FOR (p:Actor|Director) ON EACH [p.name]",
+}
+
+SHOW_INDEXES = "SHOW INDEXES YIELD name, state, populationPercent"
+
+
+def index_warnings(indexes: list[dict]) -> list[str]:
+    """List the expected indexes that are missing or not yet online"""
+    by_name = {index["name"]: index for index in indexes}
+    warnings = []
+    for name in SCHEMA_STATEMENTS:
+        index = by_name.get(name)
+        if index is None:
+            warnings.append(f"Index '{name}' is missing")
+        elif index["state"] != "ONLINE":
+            warnings.append(
+                f"Index '{name}' is {index['state']} ({index['populationPercent']:.0f}% populated)"
+            )
+    return warnings
+
+
+def apply_schema(driver, database: str | None = None) -> list[str]:
+    """Create the constraints and indexes with a sync driver and report their state"""
+    with driver.session(database=database) as session:
+        for statement in SCHEMA_STATEMENTS.values():
+            session.run(statement).consume()
+        warnings = index_warnings([dict(record) for record in session.run(SHOW_INDEXES)])
+    for warning in warnings:
+        logger.warning(warning)
+    return warnings
+
+
+async def apply_schema_async(driver, database: str | None = None) -> list[str]:
+    """Create the constraints and indexes with an async driver and report their state"""
+    async with driver.session(database=database) as session:
+        for statement in SCHEMA_STATEMENTS.values():
+            result = await session.run(statement)
+            await result.consume()
+        result = await session.run(SHOW_INDEXES)
+        warnings = index_warnings([dict(record) async for record in result])
+    for warning in warnings:
+        logger.warning(warning)
+    return warnings
@@ -1,48 +1,532 @@
 import asyncio
+import json
+import logging
 import os
+import signal
+import time
+from collections import OrderedDict
+from pathlib import Path
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent
-from neo4j import GraphDatabase
+from neo4j import AsyncGraphDatabase
 from dotenv import load_dotenv
 
+import formats
+import queries
+from backends import GraphBackend, InMemoryBackend, Neo4jBackend
+from collaborative import CollaborativeRecommender
+from formats import FORMATS, recommendation_reason
+from metrics import current_tool, metrics
+from pagerank import GraphWalkRecommender
+from ratings import RatingBuffer
+
 load_dotenv()
 
-# Connexion Neo4j
-driver = GraphDatabase.driver(
-    os.getenv("NEO4J_URI"),
-    auth=(os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD"))
-)
+logger = logging.getLogger(__name__)
+
+# Nombre maximal de requêtes Neo4j exécutées en parallèle
+MAX_CONCURRENT_QUERIES = int(os.getenv("MAX_CONCURRENT_QUERIES", "8"))
+
+# Backend du graphe : "neo4j" (par défaut) ou "memory" (index en mémoire
+# construit depuis les fichiers du loader, sans Neo4j)
+GRAPH_BACKEND = os.getenv("GRAPH_BACKEND", "neo4j")
+MEMORY_DATA_DIR = os.getenv("MEMORY_DATA_DIR", str(Path(__file__).parent / "data" / "demo"))
+
+
+# Pool de connexions Neo4j (délais en secondes)
+# Base interrogée : celle de NEO4J_DATABASE, comme pour les scripts, sinon la base par défaut
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE") or None
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+NEO4J_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "30"))
+NEO4J_MAX_CONNECTION_LIFETIME = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600"))
+NEO4J_LIVENESS_CHECK_TIMEOUT = float(os.getenv("NEO4J_LIVENESS_CHECK_TIMEOUT", "60"))
+# Connexions ouvertes au démarrage (par défaut une par requête parallèle)
+NEO4J_WARM_CONNECTIONS = int(os.getenv("NEO4J_WARM_CONNECTIONS", str(MAX_CONCURRENT_QUERIES)))
+
+
+def create_backend() -> GraphBackend:
+    """Build the graph backend selected by GRAPH_BACKEND"""
+    if GRAPH_BACKEND == "memory":
+        return InMemoryBackend.from_directory(MEMORY_DATA_DIR)
+    if GRAPH_BACKEND != "neo4j":
+        raise ValueError(f"Unknown graph backend: {GRAPH_BACKEND}")
+    # Connexion Neo4j (driver asynchrone : les requêtes ne bloquent pas la boucle MCP)
+    driver = AsyncGraphDatabase.driver(
+        os.getenv("NEO4J_URI"),
+        auth=(os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD")),
+        max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+        connection_acquisition_timeout=NEO4J_ACQUISITION_TIMEOUT,
+        max_connection_lifetime=NEO4J_MAX_CONNECTION_LIFETIME,
+        liveness_check_timeout=NEO4J_LIVENESS_CHECK_TIMEOUT
+    )
+    return Neo4jBackend(
+        driver,
+        MAX_CONCURRENT_QUERIES,
+        database=NEO4J_DATABASE,
+        max_pool_size=NEO4J_MAX_POOL_SIZE,
+        warm_connections=min(NEO4J_WARM_CONNECTIONS, MAX_CONCURRENT_QUERIES, NEO4J_MAX_POOL_SIZE)
+    )
+
+
+backend = create_backend()
+
+# Garde-fous de query_graph : lignes et octets renvoyés, délai côté serveur
+QUERY_GRAPH_MAX_ROWS = int(os.getenv("QUERY_GRAPH_MAX_ROWS", "1000"))
+QUERY_GRAPH_MAX_BYTES = int(os.getenv("QUERY_GRAPH_MAX_BYTES", "1000000"))
+QUERY_GRAPH_TIMEOUT = float(os.getenv("QUERY_GRAPH_TIMEOUT", "10"))
+QUERY_GRAPH_FETCH_SIZE = int(os.getenv("QUERY_GRAPH_FETCH_SIZE", "100"))
+
+# Cache des réponses des outils en lecture seule
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "300"))
+CACHE_DISABLED_TOOLS = {t.strip() for t in os.getenv("CACHE_DISABLED_TOOLS", "").split(",") if t.strip()}
+CACHEABLE_TOOLS = {
+    "search_movies", "get_user_preferences", "recommend_movies", "get_movie_details",
+    "recommend_movies_batch", "get_movie_details_batch",
+}
+
+# Appels identiques simultanés partagés en une seule exécution (jamais query_graph)
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() in ("1", "true", "yes")
+COALESCED_TOOLS = CACHEABLE_TOOLS
+
+# Nombre maximal de clés par appel des outils batch
+BATCH_MAX_KEYS = int(os.getenv("BATCH_MAX_KEYS", "50"))
 
 # Créer le serveur MCP
 app = Server("movie-recommender-mcp")
 
+
+class ResultCache:
+    """Bounded LRU cache with a TTL, invalidated when the graph version changes"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, version: int):
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry_version, expires_at, value = entry
+            if entry_version == version and expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, version: int, value):
+        self._entries[key] = (version, time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+result_cache = ResultCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+
+
+class SingleFlight:
+    """Share one in-flight execution between concurrent identical calls
+
+    The first caller of a key starts the work in its own task; later callers
+    wait on the same task. A cancelled caller only stops waiting: the work is
+    cancelled once every caller of the key has gone.
+    """
+
+    def __init__(self):
+        # clé -> [tâche, nombre d'appelants en attente]
+        self._flights = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def run(self, key, work):
+        flight = self._flights.get(key)
+        if flight is None:
+            task = asyncio.ensure_future(work())
+            flight = self._flights[key] = [task, 0]
+            task.add_done_callback(lambda _: self._land(key, flight))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+        task = flight[0]
+        flight[1] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done():
+                flight[1] -= 1
+                if flight[1] == 0:
+                    # Plus personne n'attend : l'appel suivant repartira de zéro
+                    self._land(key, flight)
+                    task.cancel()
+            raise
+
+    def _land(self, key, flight):
+        # Une nouvelle exécution a pu prendre la place d'une exécution annulée
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self._flights
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._flights), "executions": self.executions, "coalesced": self.coalesced}
+
+
+single_flight = SingleFlight()
+
+# Incrémenté à chaque écriture faite par le serveur : invalide le cache.
+# Les écritures faites hors du serveur (loader, setup_data) expirent via le TTL.
+graph_version = 0
+
+
+def bump_graph_version():
+    """Mark the graph as changed so cached responses are no longer served"""
+    global graph_version
+    graph_version += 1
+
+
+# Notes reçues par rate_movie / rate_movies : écrites par lots de
+# RATING_FLUSH_SIZE, au plus tard après RATING_FLUSH_INTERVAL secondes
+RATING_FLUSH_SIZE = int(os.getenv("RATING_FLUSH_SIZE", "100"))
+RATING_FLUSH_INTERVAL = float(os.getenv("RATING_FLUSH_INTERVAL", "5"))
+RATING_BUFFER_MAX = int(os.getenv("RATING_BUFFER_MAX", "1000"))
+RATING_MIN, RATING_MAX = 1, 5
+
+
+def ratings_flushed(rows: list[dict]):
+    """Invalidate what was derived from the old ratings once a batch is written
+
+    The cache follows the graph version; the collaborative and graph-walk
+    models are rebuilt in the background, at most every
+    MODEL_REBUILD_INTERVAL seconds; the SIMILAR neighbours of the affected
+    movies are marked stale by the write.
+    """
+    bump_graph_version()
+
+
+rating_buffer = RatingBuffer(
+    lambda rows: backend.write_ratings(rows),
+    on_flush=ratings_flushed,
+    flush_size=RATING_FLUSH_SIZE,
+    flush_interval=RATING_FLUSH_INTERVAL,
+    max_pending=RATING_BUFFER_MAX
+)
+
+
+def rating_row(rating: dict) -> dict:
+    """Validate one rate_movie argument set and turn it into a buffered row"""
+    value = rating["rating"]
+    if not isinstance(value, (int, float)) or not RATING_MIN <= value <= RATING_MAX:
+        raise ValueError(f"Rating must be a number between {RATING_MIN} and {RATING_MAX}, got {value!r}")
+    return {"user": rating["user_name"], "title": rating["title"], "rating": value}
+
+
+# Délai minimal entre deux reconstructions des modèles causées par de nouvelles notes
+MODEL_REBUILD_INTERVAL = float(os.getenv("MODEL_REBUILD_INTERVAL", "60"))
+
+
+class RefreshingModel:
+    """An in-memory model rebuilt in the background when the graph changes
+
+    Only the first build is awaited. Afterwards a stale model keeps being
+    served while its replacement is built, so a rating flush never makes a
+    request pay for the export and the matrix build. Rebuilds caused by a new
+    graph version happen at most every min_interval seconds, and
+    refresh_seconds bounds the age of the model.
+    """
+
+    def __init__(self, name: str, build, refresh_seconds: float, min_interval: float = MODEL_REBUILD_INTERVAL):
+        # build() -> nouveau modèle, construit depuis le backend courant
+        self.name = name
+        self.build = build
+        self.refresh_seconds = refresh_seconds
+        self.min_interval = min_interval
+        self.model = None
+        self.version = None
+        self.built_at = 0.0
+        self.rebuilds = 0
+        self._lock = asyncio.Lock()
+        self._rebuild = None
+
+    def stale(self) -> bool:
+        age = time.monotonic() - self.built_at
+        return age > self.refresh_seconds or (self.version != graph_version and age > self.min_interval)
+
+    async def get(self):
+        """Return the current model, starting a background rebuild if it is stale"""
+        if self.model is None:
+            async with self._lock:
+                if self.model is None:
+                    await self._build()
+        elif self._rebuild is None and self.stale():
+            self._rebuild = asyncio.create_task(self._build_in_background())
+        return self.model
+
+    async def _build(self):
+        version = graph_version
+        start = time.perf_counter()
+        model = await self.build()
+        self.model, self.version, self.built_at = model, version, time.monotonic()
+        self.rebuilds += 1
+        metrics.observe(self.name, "rebuild", (time.perf_counter() - start) * 1000)
+
+    async def _build_in_background(self):
+        try:
+            async with self._lock:
+                await self._build()
+        except Exception:
+            # L'ancien modèle reste servi ; le prochain appel réessaie
+            logger.exception("Rebuilding the %s model failed", self.name)
+        finally:
+            self._rebuild = None
+
+    async def close(self):
+        if self._rebuild is not None:
+            self._rebuild.cancel()
+
+
+async def build_collaborative_model() -> CollaborativeRecommender:
+    records = await backend.ratings()
+    return await asyncio.to_thread(CollaborativeRecommender.from_records, records)
+
+
+async def build_walk_model() -> GraphWalkRecommender:
+    records = await backend.graph_edges()
+    return await asyncio.to_thread(
+        GraphWalkRecommender.from_records, records,
+        time_budget=PAGERANK_TIME_BUDGET, cache_size=PAGERANK_CACHE_USERS
+    )
+
+
+# Modèle collaboratif en mémoire, reconstruit quand le graphe change ou expire
+COLLABORATIVE_REFRESH_SECONDS = float(os.getenv("COLLABORATIVE_REFRESH_SECONDS", "600"))
+collaborative_model = RefreshingModel("collaborative", build_collaborative_model, COLLABORATIVE_REFRESH_SECONDS)
+
+# Marche aléatoire (PageRank personnalisé) : même cycle de vie que le modèle
+# collaboratif, durée de marche bornée et résultats gardés par utilisateur
+PAGERANK_REFRESH_SECONDS = float(os.getenv("PAGERANK_REFRESH_SECONDS", "600"))
+PAGERANK_TIME_BUDGET = float(os.getenv("PAGERANK_TIME_BUDGET", "0.2"))
+PAGERANK_CACHE_USERS = int(os.getenv("PAGERANK_CACHE_USERS", "1024"))
+walk_model = RefreshingModel("pagerank", build_walk_model, PAGERANK_REFRESH_SECONDS)
+
+RECOMMENDATION_STRATEGIES = ["similar", "genre", "collaborative", "pagerank"]
+
+
+def response_version(arguments: dict):
+    """Version a cached response depends on: the graph, plus the model generation for model strategies
+
+    A response computed from a stale model stays stored under the old
+    generation, so it is no longer served once the rebuilt model is in place.
+    """
+    model = {"collaborative": collaborative_model, "pagerank": walk_model}.get(arguments.get("strategy"))
+    return (graph_version, model.rebuilds) if model is not None else graph_version
+
+
+def cache_key(name: str, arguments: dict) -> tuple[str, str]:
+    """Normalize the arguments so equivalent calls share a cache entry"""
+    normalized = {k: v for k, v in arguments.items() if v is not None and v != ""}
+    return name, json.dumps(normalized, sort_keys=True, default=str)
+
+
+async def recommendations_for(user_names: list[str], strategy: str) -> dict[str, list[dict]]:
+    """Recommendations for each user; several users share one query per step"""
+    if strategy in ("collaborative", "pagerank"):
+        if strategy == "collaborative":
+            model, field = await collaborative_model.get(), "cf_score"
+        else:
+            model, field = await walk_model.get(), "walk_score"
+        # Le produit matriciel ne doit pas bloquer la boucle d'événements
+        scores = await asyncio.to_thread(model.recommend_batch, user_names)
+        titles = list(dict.fromkeys(title for ranked in scores.values() for title, _ in ranked))
+        movies = {movie["title"]: movie for movie in await backend.movies_by_title(titles)}
+        return {
+            user_name: [
+                {**movies[title], field: score}
+                for title, score in scores.get(user_name, [])
+                if title in movies
+            ]
+            for user_name in user_names
+        }
+    
+    if len(user_names) == 1:
+        user_name = user_names[0]
+        if strategy == "genre":
+            return {user_name: await backend.recommend_by_genre(user_name)}
+        # Repli sur les genres tant que l'index SIMILAR n'est pas calculé
+        recommendations = await backend.recommend_similar(user_name)
+        return {user_name: recommendations or await backend.recommend_by_genre(user_name)}
+    
+    if strategy == "genre":
+        recommendations = await backend.recommend_by_genre_batch(user_names)
+    else:
+        recommendations = await backend.recommend_similar_batch(user_names)
+        missing = [user_name for user_name in user_names if not recommendations.get(user_name)]
+        if missing:
+            recommendations.update(await backend.recommend_by_genre_batch(missing))
+    return {user_name: recommendations.get(user_name, []) for user_name in user_names}
+
+
+async def movie_details_for(titles: list[str]) -> dict[str, dict]:
+    """Details of each title, falling back to the closest fuzzy match for unknown titles"""
+    if len(titles) == 1:
+        movie = await backend.movie_details(titles[0])
+        movies = {titles[0]: movie} if movie else {}
+    else:
+        movies = await backend.movie_details_batch(titles)
+    missing = [title for title in titles if title not in movies]
+    if missing:
+        closest = dict(zip(missing, await asyncio.gather(*[backend.closest_title(title) for title in missing])))
+        found = await backend.movie_details_batch(list(dict.fromkeys(t for t in closest.values() if t)))
+        movies.update({title: found[match] for title, match in closest.items() if match in found})
+    return movies
+
+
+def format_search_results(movies: list[dict], total: int, offset: int) -> str:
+    if not movies:
+        return f"Found {total} movies."
+    
+    first = offset + 1
+    last = offset + len(movies)
+    return f"Found {total} movies (showing {first}-{last}):\n\n" + "\n".join([
+        f"• {m['title']} ({m['year']}) - Rating: {m['rating']}/10\n"
+        f"  Description: {m['description']}\n"
+        f"  Actors: {', '.join(m['actors']) if m['actors'] else 'N/A'}\n"
+        f"  Directors: {', '.join(m['directors']) if m['directors'] else 'N/A'}\n"
+        f"  Genres: {', '.join(m['genres']) if m['genres'] else 'N/A'}"
+        for m in movies
+    ])
+
+
+def format_preferences(user_name: str, preferences: list[dict]) -> str:
+    if not preferences:
+        return f"User '{user_name}' not found or has no preferences."
+    
+    return f"{user_name}'s favorite movies:\n\n" + "\n".join([
+        f"• {p['title']} ({p['year']}) - User Rating: {p['rating']}/5\n"
+        f"  Genres: {', '.join(p['genres']) if p['genres'] else 'N/A'}\n"
+        f"  Description: {p['description']}"
+        for p in preferences
+    ])
+
+
+def format_recommendations(user_name: str, recommendations: list[dict]) -> str:
+    if not recommendations:
+        return f"No recommendations found for {user_name}."
+    
+    return f"Recommendations for {user_name}:\n\n" + "\n".join([
+        f"• {r['title']} ({r['year']}) - Rating: {r['rating']}/10\n"
+        f"  Why: {recommendation_reason(r)}\n"
+        f"  Description: {r['description']}\n"
+        f"  Actors: {', '.join(r['actors']) if r['actors'] else 'N/A'}\n"
+        f"  Directors: {', '.join(r['directors']) if r['directors'] else 'N/A'}"
+        for r in recommendations
+    ])
+
+
+def format_movie_details(title: str, movie: dict | None) -> str:
+    if not movie:
+        return f"Movie '{title}' not found."
+    
+    closest = f"No movie titled '{title}', showing the closest match.\n\n" if movie['title'] != title else ""
+    
+    user_ratings_text = "\n  ".join([
+        f"{ur['user']}: {ur['rating']}/5"
+        for ur in movie['user_ratings']
+        if ur['user']
+    ]) if movie['user_ratings'] else "No user ratings yet"
+    
+    return (f"{closest}**{movie['title']}** ({movie['year']})\n\n"
+            f"Rating: {movie['rating']}/10\n"
+            f"Description: {movie['description']}\n\n"
+            f"Actors: {', '.join(movie['actors']) if movie['actors'] else 'N/A'}\n"
+            f"Directors: {', '.join(movie['directors']) if movie['directors'] else 'N/A'}\n"
+            f"Genres: {', '.join(movie['genres']) if movie['genres'] else 'N/A'}\n\n"
+            f"User Ratings:\n  {user_ratings_text}")
+
+
+def format_query_results(result: dict) -> str:
+    records = result["records"]
+    text = f"Query results ({len(records)} rows):\n\n" + str(records)
+    if result["truncated"]:
+        text += (f"\n\nResults truncated after {len(records)} rows "
+                 f"(limits: {QUERY_GRAPH_MAX_ROWS} rows, {QUERY_GRAPH_MAX_BYTES} bytes). "
+                 f"Available after {result['result_available_after']} ms, "
+                 f"consumed after {result['result_consumed_after']} ms.")
+    return text
+
+
+# Arguments de format communs à tous les outils
+FORMAT_PROPERTIES = {
+    "format": {
+        "type": "string",
+        "enum": FORMATS,
+        "description": "text (readable, default), compact (one line per movie) "
+                       "or json (columnar, names listed once and referenced by index)"
+    },
+    "include_description": {
+        "type": "boolean",
+        "description": "Keep movie descriptions in the compact and json formats"
+    }
+}
+
+
 @app.list_tools()
 async def list_tools() -> list[Tool]:
     """Liste des outils disponibles pour le LLM"""
-    return [
+    tools = [
         Tool(
             name="search_movies",
-            description="Search for movies by genre, actor, director, or rating",
+            description="Search for movies by free text, genre, actor, director, or rating",
             inputSchema={
                 "type": "object",
                 "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "Words from the title or description (typo tolerant, ranked by relevance)"
+                    },
                     "genre": {
                         "type": "string",
                         "description": "Genre of the movie (Sci-Fi, Action, Thriller, Drama, Comedy, Mystery)"
                     },
                     "actor": {
                         "type": "string",
-                        "description": "Name of the actor"
+                        "description": "Name of the actor (case-insensitive, typo tolerant)"
                     },
                     "director": {
                         "type": "string",
-                        "description": "Name of the director"
+                        "description": "Name of the director (case-insensitive, typo tolerant)"
                     },
                     "min_rating": {
                         "type": "number",
                         "description": "Minimum rating (0-10)"
-                    }
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Maximum number of movies to return (default 5, max 50)"
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "description": "Number of movies to skip, for pagination (default 0)"
+                    },
+                    **FORMAT_PROPERTIES
                 }
             }
         ),
@@ -55,7 +539,8 @@ async def list_tools() -> list[Tool]:
                     "user_name": {
                         "type": "string",
                         "description": "Name of the user (Alice, Bob, or Charlie)"
-                    }
+                    },
+                    **FORMAT_PROPERTIES
                 },
                 "required": ["user_name"]
             }
@@ -69,227 +554,373 @@ async def list_tools() -> list[Tool]:
                     "user_name": {
                         "type": "string",
                         "description": "Name of the user"
-                    }
+                    },
+                    "strategy": {
+                        "type": "string",
+                        "enum": RECOMMENDATION_STRATEGIES,
+                        "description": "similar (precomputed similar movies, default), "
+                                       "genre (shared genres), collaborative (users with similar ratings) "
+                                       "or pagerank (random walks through shared cast, crew, genres and fans)"
+                    },
+                    **FORMAT_PROPERTIES
                 },
                 "required": ["user_name"]
             }
         ),
         Tool(
             name="get_movie_details",
-            description="Get detailed information about a specific movie",
+            description="Get detailed information about a specific movie (closest title if no exact match)",
             inputSchema={
                 "type": "object",
                 "properties": {
                     "title": {
                         "type": "string",
                         "description": "Title of the movie"
-                    }
+                    },
+                    **FORMAT_PROPERTIES
                 },
                 "required": ["title"]
             }
         ),
+        Tool(
+            name="recommend_movies_batch",
+            description="Recommend movies for several users at once",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "user_names": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "maxItems": BATCH_MAX_KEYS,
+                        "description": "Names of the users"
+                    },
+                    "strategy": {
+                        "type": "string",
+                        "enum": RECOMMENDATION_STRATEGIES,
+                        "description": "Same as recommend_movies"
+                    },
+                    **FORMAT_PROPERTIES
+                },
+                "required": ["user_names"]
+            }
+        ),
+        Tool(
+            name="get_movie_details_batch",
+            description="Get detailed information about several movies at once",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "titles": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "maxItems": BATCH_MAX_KEYS,
+                        "description": "Titles of the movies"
+                    },
+                    **FORMAT_PROPERTIES
+                },
+                "required": ["titles"]
+            }
+        ),
+        Tool(
+            name="rate_movie",
+            description="Record a user's rating of a movie (written in batches within a few seconds)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "user_name": {
+                        "type": "string",
+                        "description": "Name of the user (created if new)"
+                    },
+                    "title": {
+                        "type": "string",
+                        "description": "Exact title of the movie"
+                    },
+                    "rating": {
+                        "type": "number",
+                        "minimum": RATING_MIN,
+                        "maximum": RATING_MAX,
+                        "description": "Rating from 1 to 5"
+                    },
+                    **FORMAT_PROPERTIES
+                },
+                "required": ["user_name", "title", "rating"]
+            }
+        ),
+        Tool(
+            name="rate_movies",
+            description="Record several ratings at once",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "ratings": {
+                        "type": "array",
+                        "maxItems": BATCH_MAX_KEYS,
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "user_name": {"type": "string"},
+                                "title": {"type": "string"},
+                                "rating": {"type": "number", "minimum": RATING_MIN, "maximum": RATING_MAX}
+                            },
+                            "required": ["user_name", "title", "rating"]
+                        },
+                        "description": "Ratings as {user_name, title, rating}"
+                    },
+                    **FORMAT_PROPERTIES
+                },
+                "required": ["ratings"]
+            }
+        ),
         Tool(
             name="query_graph",
-            description="Execute a custom Cypher query on the graph database",
+            description="Execute a custom read-only Cypher query on the graph database "
+                        "(results are capped in rows and size)",
             inputSchema={
                 "type": "object",
                 "properties": {
                     "query": {
                         "type": "string",
                         "description": "Cypher query to execute"
-                    }
+                    },
+                    **FORMAT_PROPERTIES
                 },
                 "required": ["query"]
             }
+        ),
+        Tool(
+            name="server_stats",
+            description="Get the server's cache counters and per-tool timings",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "prometheus": {
+                        "type": "boolean",
+                        "description": "Return the metrics in the Prometheus text format"
+                    },
+                    **FORMAT_PROPERTIES
+                }
+            }
         )
     ]
+    return [tool for tool in tools if tool.name != "query_graph" or backend.runs_cypher]
+
+# (backend, noms de ses outils)
+known_tools = None
+
+
+async def tool_names() -> set[str]:
+    """Names of the tools declared by list_tools for the current backend"""
+    global known_tools
+    if known_tools is None or known_tools[0] is not backend:
+        known_tools = (backend, {tool.name for tool in await list_tools()})
+    return known_tools[1]
+
 
 @app.call_tool()
 async def call_tool(name: str, arguments: dict) -> list[TextContent]:
-    """Execute a tool based on the LLM's request"""
-    
-    if name == "search_movies":
-        # Build dynamic query based on provided filters
-        conditions = []
-        
-        if "genre" in arguments and arguments["genre"]:
-            conditions.append(f"g.name = '{arguments['genre']}'")
-        if "actor" in arguments and arguments["actor"]:
-            conditions.append(f"a.name CONTAINS '{arguments['actor']}'")
-        if "director" in arguments and arguments["director"]:
-            conditions.append(f"d.name CONTAINS '{arguments['director']}'")
-        if "min_rating" in arguments and arguments["min_rating"]:
-            conditions.append(f"m.rating >= {arguments['min_rating']}")
-        
-        where_clause = " AND ".join(conditions) if conditions else "true"
-        
-        query = f"""
-        MATCH (m:Movie)
-        OPTIONAL MATCH (m)<-[:ACTED_IN]-(a:Actor)
-        OPTIONAL MATCH (m)<-[:DIRECTED]-(d:Director)
-        OPTIONAL MATCH (m)-[:HAS_GENRE]->(g:Genre)
-        WHERE {where_clause}
-        RETURN DISTINCT m.title as title, 
-               m.year as year, 
-               m.rating as rating,
-               m.description as description,
-               collect(DISTINCT a.name) as actors,
-               collect(DISTINCT d.name) as directors,
-               collect(DISTINCT g.name) as genres
-        ORDER BY m.rating DESC
-        """
+    """Execute a tool based on the LLM's request
+
+    Read-only tools are served from the cache, and identical calls already
+    in flight share a single execution.
+    """
+    # Refusé avant toute métrique : un nom inconnu ne crée pas de série
+    if name not in await tool_names():
+        raise ValueError(f"Unknown tool: {name}")
+    current_tool.set(name)
+    with metrics.span(name, "total"):
+        if name not in COALESCED_TOOLS:
+            return await execute_tool(name, arguments)
         
-        with driver.session() as session:
-            result = session.run(query)
-            movies = [dict(record) for record in result]
+        key = cache_key(name, arguments)
+        version = response_version(arguments)
+        use_cache = name not in CACHE_DISABLED_TOOLS
+        if use_cache:
+            cached = result_cache.get(key, version)
+            if cached is not None:
+                metrics.increment(name, "cache_hits")
+                return cached
         
-        return [TextContent(
-            type="text",
-            text=f"Found {len(movies)} movies:\n\n" + "\n".join([
-                f"• {m['title']} ({m['year']}) - Rating: {m['rating']}/10\n"
-                f"  Description: {m['description']}\n"
-                f"  Actors: {', '.join(m['actors']) if m['actors'] else 'N/A'}\n"
-                f"  Directors: {', '.join(m['directors']) if m['directors'] else 'N/A'}\n"
-                f"  Genres: {', '.join(m['genres']) if m['genres'] else 'N/A'}"
-                for m in movies[:5]  # Limit to 5 for readability
-            ])
-        )]
+        if SINGLE_FLIGHT_ENABLED:
+            if (key, version) in single_flight:
+                metrics.increment(name, "coalesced")
+            response = await single_flight.run((key, version), lambda: execute_tool(name, arguments))
+        else:
+            response = await execute_tool(name, arguments)
+        if use_cache:
+            result_cache.put(key, version, response)
+        return response
+
+async def execute_tool(name: str, arguments: dict) -> list[TextContent]:
+    """Execute a tool against the graph backend"""
+    fmt = arguments.get("format") or "text"
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt}")
+    include_description = bool(arguments.get("include_description"))
+    
+    if name == "search_movies":
+        _, _, offset = queries.search_page(arguments)
+        movies, total = await backend.search_movies(arguments)
+        with metrics.span(name, "format"):
+            if fmt == "json":
+                text = formats.columnar(movies, include_description, total=total, offset=offset)
+            elif fmt == "compact":
+                text = formats.compact_search_results(movies, total, offset, include_description)
+            else:
+                text = format_search_results(movies, total, offset)
+            return [TextContent(type="text", text=text)]
     
     elif name == "get_user_preferences":
         user_name = arguments["user_name"]
-        query = f"""
-        MATCH (u:User {{name: '{user_name}'}})-[l:LIKES]->(m:Movie)
-        OPTIONAL MATCH (m)-[:HAS_GENRE]->(g:Genre)
-        RETURN m.title as title, 
-               l.rating as rating, 
-               m.year as year,
-               m.description as description,
-               collect(DISTINCT g.name) as genres
-        ORDER BY l.rating DESC
-        """
-        
-        with driver.session() as session:
-            result = session.run(query)
-            preferences = [dict(record) for record in result]
-        
-        if not preferences:
-            return [TextContent(type="text", text=f"User '{user_name}' not found or has no preferences.")]
-        
-        return [TextContent(
-            type="text",
-            text=f"{user_name}'s favorite movies:\n\n" + "\n".join([
-                f"• {p['title']} ({p['year']}) - User Rating: {p['rating']}/5\n"
-                f"  Genres: {', '.join(p['genres']) if p['genres'] else 'N/A'}\n"
-                f"  Description: {p['description']}"
-                for p in preferences
-            ])
-        )]
+        preferences = await backend.user_preferences(user_name)
+        with metrics.span(name, "format"):
+            if fmt == "json":
+                text = formats.columnar(preferences, include_description, user=user_name)
+            elif fmt == "compact":
+                text = formats.compact_preferences(user_name, preferences, include_description)
+            else:
+                text = format_preferences(user_name, preferences)
+            return [TextContent(type="text", text=text)]
     
-    elif name == "recommend_movies":
-        user_name = arguments["user_name"]
-        # Recommend movies based on shared genres with liked movies
-        query = f"""
-        MATCH (u:User {{name: '{user_name}'}})-[:LIKES]->(liked:Movie)-[:HAS_GENRE]->(g:Genre)
-        <-[:HAS_GENRE]-(recommended:Movie)
-        WHERE NOT (u)-[:LIKES]->(recommended)
-        WITH recommended, collect(DISTINCT g.name) as shared_genres, count(DISTINCT g) as genre_match_count
-        OPTIONAL MATCH (recommended)<-[:ACTED_IN]-(a:Actor)
-        OPTIONAL MATCH (recommended)<-[:DIRECTED]-(d:Director)
-        RETURN DISTINCT recommended.title as title, 
-               recommended.rating as rating,
-               recommended.year as year,
-               recommended.description as description,
-               shared_genres,
-               genre_match_count,
-               collect(DISTINCT a.name) as actors,
-               collect(DISTINCT d.name) as directors
-        ORDER BY genre_match_count DESC, recommended.rating DESC
-        LIMIT 5
-        """
-        
-        with driver.session() as session:
-            result = session.run(query)
-            recommendations = [dict(record) for record in result]
-        
-        if not recommendations:
-            return [TextContent(type="text", text=f"No recommendations found for {user_name}.")]
-        
-        return [TextContent(
-            type="text",
-            text=f"Recommendations for {user_name}:\n\n" + "\n".join([
-                f"• {r['title']} ({r['year']}) - Rating: {r['rating']}/10\n"
-                f"  Why: Shares {r['genre_match_count']} genre(s) with your favorites ({', '.join(r['shared_genres'])})\n"
-                f"  Description: {r['description']}\n"
-                f"  Actors: {', '.join(r['actors']) if r['actors'] else 'N/A'}\n"
-                f"  Directors: {', '.join(r['directors']) if r['directors'] else 'N/A'}"
-                for r in recommendations
-            ])
-        )]
+    elif name in ("recommend_movies", "recommend_movies_batch"):
+        if name == "recommend_movies":
+            user_names = [arguments["user_name"]]
+        else:
+            user_names = list(dict.fromkeys(arguments["user_names"]))[:BATCH_MAX_KEYS]
+        strategy = arguments.get("strategy") or "similar"
+        recommendations = await recommendations_for(user_names, strategy)
+        with metrics.span(name, "format"):
+            if fmt == "json":
+                # Une seule charge utile pour tout le lot : les noms sont partagés
+                rows = [
+                    {"user": user_name, **recommendation}
+                    for user_name in user_names
+                    for recommendation in recommendations[user_name]
+                ]
+                return [TextContent(type="text", text=formats.columnar(rows, include_description, strategy=strategy))]
+            return [
+                TextContent(
+                    type="text",
+                    text=formats.compact_recommendations(user_name, recommendations[user_name], include_description)
+                    if fmt == "compact" else format_recommendations(user_name, recommendations[user_name])
+                )
+                for user_name in user_names
+            ]
     
-    elif name == "get_movie_details":
-        title = arguments["title"]
-        query = f"""
-        MATCH (m:Movie {{title: '{title}'}})
-        OPTIONAL MATCH (m)<-[:ACTED_IN]-(a:Actor)
-        OPTIONAL MATCH (m)<-[:DIRECTED]-(d:Director)
-        OPTIONAL MATCH (m)-[:HAS_GENRE]->(g:Genre)
-        OPTIONAL MATCH (u:User)-[l:LIKES]->(m)
-        RETURN m.title as title,
-               m.year as year,
-               m.rating as rating,
-               m.description as description,
-               collect(DISTINCT a.name) as actors,
-               collect(DISTINCT d.name) as directors,
-               collect(DISTINCT g.name) as genres,
-               collect(DISTINCT {{user: u.name, rating: l.rating}}) as user_ratings
-        """
-        
-        with driver.session() as session:
-            result = session.run(query)
-            movie = result.single()
-        
-        if not movie:
-            return [TextContent(type="text", text=f"Movie '{title}' not found.")]
-        
-        user_ratings_text = "\n  ".join([
-            f"{ur['user']}: {ur['rating']}/5"
-            for ur in movie['user_ratings']
-            if ur['user']
-        ]) if movie['user_ratings'] else "No user ratings yet"
-        
-        return [TextContent(
-            type="text",
-            text=f"**{movie['title']}** ({movie['year']})\n\n"
-                 f"Rating: {movie['rating']}/10\n"
-                 f"Description: {movie['description']}\n\n"
-                 f"Actors: {', '.join(movie['actors']) if movie['actors'] else 'N/A'}\n"
-                 f"Directors: {', '.join(movie['directors']) if movie['directors'] else 'N/A'}\n"
-                 f"Genres: {', '.join(movie['genres']) if movie['genres'] else 'N/A'}\n\n"
-                 f"User Ratings:\n  {user_ratings_text}"
-        )]
+    elif name in ("get_movie_details", "get_movie_details_batch"):
+        if name == "get_movie_details":
+            titles = [arguments["title"]]
+        else:
+            titles = list(dict.fromkeys(arguments["titles"]))[:BATCH_MAX_KEYS]
+        movies = await movie_details_for(titles)
+        with metrics.span(name, "format"):
+            if fmt == "json":
+                text = formats.columnar(
+                    [movies[title] for title in titles if title in movies], include_description,
+                    missing=[title for title in titles if title not in movies]
+                )
+                return [TextContent(type="text", text=text)]
+            return [
+                TextContent(
+                    type="text",
+                    text=formats.compact_movie_details(title, movies.get(title), include_description)
+                    if fmt == "compact" else format_movie_details(title, movies.get(title))
+                )
+                for title in titles
+            ]
+    
+    elif name in ("rate_movie", "rate_movies"):
+        ratings = arguments["ratings"][:BATCH_MAX_KEYS] if name == "rate_movies" else [arguments]
+        rows = [rating_row(rating) for rating in ratings]
+        pending = await rating_buffer.add(rows)
+        if fmt == "json":
+            text = json.dumps({"queued": len(rows), "pending": pending}, separators=(",", ":"))
+        else:
+            text = (f"Queued {len(rows)} rating(s), {pending} pending; "
+                    f"they are written within {RATING_FLUSH_INTERVAL:g} s.")
+        return [TextContent(type="text", text=text)]
     
     elif name == "query_graph":
-        query = arguments["query"]
-        
-        with driver.session() as session:
-            result = session.run(query)
-            records = [dict(record) for record in result]
-        
+        result = await backend.run_cypher(
+            arguments["query"],
+            max_rows=QUERY_GRAPH_MAX_ROWS,
+            max_bytes=QUERY_GRAPH_MAX_BYTES,
+            timeout=QUERY_GRAPH_TIMEOUT,
+            fetch_size=QUERY_GRAPH_FETCH_SIZE
+        )
+        with metrics.span(name, "format"):
+            if fmt == "json":
+                text = formats.columnar(
+                    result["records"], include_description=True, intern=False,
+                    truncated=result["truncated"],
+                    result_available_after=result["result_available_after"],
+                    result_consumed_after=result["result_consumed_after"]
+                )
+            elif fmt == "compact":
+                text = formats.compact_query_results(result)
+            else:
+                text = format_query_results(result)
+            return [TextContent(type="text", text=text)]
+    
+    elif name == "server_stats":
+        if arguments.get("prometheus"):
+            return [TextContent(type="text", text=metrics.render_prometheus())]
+        stats = result_cache.stats()
+        pool = backend.pool_stats()
+        flights = single_flight.stats()
+        buffered = rating_buffer.stats()
+        if fmt == "json":
+            return [TextContent(type="text", text=json.dumps({
+                "graph_version": graph_version,
+                "cache": {**stats, "max_entries": result_cache.max_entries},
+                "single_flight": flights,
+                "ratings": buffered,
+                "pool": pool,
+                "tools": metrics.snapshot(),
+            }, separators=(",", ":")))]
+        pool_line = (
+            f"Pool ({pool['database'] or 'default database'}): {pool['active_sessions']}/{pool['query_slots']} sessions active, "
+            f"peak {pool['peak_sessions']}, {pool['sessions_opened']} opened, max pool size {pool['max_pool_size']}, "
+            f"{pool['slot_waits']} waits (mean {pool['mean_slot_wait_ms']:.2f} ms, "
+            f"max {pool['max_slot_wait_ms']:.2f} ms)\n"
+        ) if pool else ""
         return [TextContent(
             type="text",
-            text=f"Query results ({len(records)} rows):\n\n" + str(records)
+            text=f"Graph version: {graph_version}\n"
+                 f"Cache: {stats['entries']}/{result_cache.max_entries} entries, "
+                 f"{stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions\n"
+                 f"Single-flight: {flights['in_flight']} in flight, {flights['executions']} executions, "
+                 f"{flights['coalesced']} calls coalesced (backend calls saved)\n"
+                 f"Ratings: {buffered['pending']}/{buffered['max_pending']} pending, {buffered['flushed']} written, "
+                 f"{buffered['skipped']} skipped (unknown titles), {buffered['backpressure_waits']} backpressure waits\n"
+                 + pool_line + "\n"
+                 + metrics.render_text()
         )]
     
     raise ValueError(f"Unknown tool: {name}")
 
 async def main():
     """Launch the MCP server"""
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(
-            read_stream, 
-            write_stream, 
-            app.create_initialization_options()
-        )
+    await backend.prepare()
+    rating_buffer.start()
+    # SIGTERM arrête le serveur proprement : les notes en attente sont écrites
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except (NotImplementedError, RuntimeError):
+        pass
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await app.run(
+                read_stream, 
+                write_stream, 
+                app.create_initialization_options()
+            )
+    finally:
+        try:
+            await collaborative_model.close()
+            await walk_model.close()
+            await rating_buffer.close()
+        finally:
+            await backend.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
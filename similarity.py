@@ -0,0 +1,124 @@
+"""Pré-calcul des films similaires (relations SIMILAR) pour recommend_movies.
+
+Pour chaque film, le score d'un autre film est la somme pondérée des genres,
+réalisateurs, acteurs et utilisateurs (co-likes) qu'ils partagent. Seuls les
+films reliés par un réalisateur, un acteur ou un co-like sont candidats : les
+genres ne font que les départager, sans quoi chaque film parcourrait tous
+ceux de ses genres. Seuls les K meilleurs voisins sont conservés sous forme
+de (m)-[:SIMILAR {score}]->(other) ; un film sans voisin retombe sur la
+recommandation par genre.
+
+Le mode incrémental ne recalcule que les films marqués similarity_stale,
+positionné par le loader quand de nouveaux LIKES arrivent.
+"""
+
+import argparse
+import os
+import time
+
+from neo4j import GraphDatabase
+from dotenv import load_dotenv
+
+from loader import batches
+
+DEFAULT_TOP_K = 20
+DEFAULT_BATCH_SIZE = 100
+
+# Poids de chaque type de lien partagé
+WEIGHTS = {
+    "genre_weight": 1.0,
+    "director_weight": 2.0,
+    "actor_weight": 1.5,
+    "co_like_weight": 1.0,
+}
+
+ALL_TITLES = "MATCH (m:Movie) RETURN m.title AS title"
+
+STALE_TITLES = "MATCH (m:Movie) WHERE m.similarity_stale RETURN m.title AS title"
+
+CLEAR_SIMILAR = """
+UNWIND $titles AS title
+MATCH (m:Movie {title: title})
+OPTIONAL MATCH (m)-[old:SIMILAR]->()
+DELETE old
+WITH DISTINCT m
+REMOVE m.similarity_stale
+"""
+
+# Les candidats viennent des réalisateurs, acteurs et co-likes ; les genres ne
+# font que les départager, car un genre relie une grande part du catalogue
+COMPUTE_SIMILAR = """
+UNWIND $titles AS title
+MATCH (m:Movie {title: title})
+CALL {
+    WITH m
+    MATCH (m)<-[:DIRECTED]-(:Director)-[:DIRECTED]->(other:Movie)
+    RETURN other, $director_weight AS weight
+    UNION ALL
+    WITH m
+    MATCH (m)<-[:ACTED_IN]-(:Actor)-[:ACTED_IN]->(other:Movie)
+    RETURN other, $actor_weight AS weight
+    UNION ALL
+    WITH m
+    MATCH (m)<-[:LIKES]-(:User)-[:LIKES]->(other:Movie)
+    RETURN other, $co_like_weight AS weight
+}
+WITH m, other, sum(weight) AS score
+WHERE other <> m
+WITH m, other, score + $genre_weight * COUNT { (m)-[:HAS_GENRE]->(:Genre)<-[:HAS_GENRE]-(other) } AS score
+ORDER BY score DESC, other.rating DESC
+WITH m, collect({movie: other, score: score})[..$k] AS neighbours
+UNWIND neighbours AS neighbour
+WITH m, neighbour.movie AS other, neighbour.score AS score
+CREATE (m)-[:SIMILAR {score: score}]->(other)
+"""
+
+
+def _refresh_batch(tx, titles: list[str], k: int):
+    tx.run(CLEAR_SIMILAR, titles=titles).consume()
+    tx.run(COMPUTE_SIMILAR, titles=titles, k=k, **WEIGHTS).consume()
+
+
+def refresh_similarity(driver, titles: list[str], k: int = DEFAULT_TOP_K,
+                       batch_size: int = DEFAULT_BATCH_SIZE, database: str | None = None) -> int:
+    """Recompute the top-K SIMILAR neighbours of the given movies"""
+    with driver.session(database=database) as session:
+        for batch in batches(titles, batch_size):
+            session.execute_write(_refresh_batch, batch, k)
+    return len(titles)
+
+
+def build_similarity_index(driver, incremental: bool = False, k: int = DEFAULT_TOP_K,
+                           batch_size: int = DEFAULT_BATCH_SIZE, database: str | None = None) -> int:
+    """Recompute every movie's neighbours, or only the stale ones when incremental"""
+    with driver.session(database=database) as session:
+        titles = [record["title"] for record in session.run(STALE_TITLES if incremental else ALL_TITLES)]
+    return refresh_similarity(driver, titles, k, batch_size, database)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute SIMILAR relationships between movies")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only refresh movies whose LIKES changed since the last run")
+    parser.add_argument("--k", type=int, default=DEFAULT_TOP_K,
+                        help=f"Neighbours kept per movie (default {DEFAULT_TOP_K})")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Movies per write transaction (default {DEFAULT_BATCH_SIZE})")
+    args = parser.parse_args()
+
+    load_dotenv()
+    driver = GraphDatabase.driver(
+        os.getenv("NEO4J_URI"),
+        auth=(os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD"))
+    )
+    try:
+        start = time.perf_counter()
+        count = build_similarity_index(driver, args.incremental, args.k, args.batch_size,
+                                       os.getenv("NEO4J_DATABASE") or None)
+        print(f"🔗 {count} films mis à jour en {time.perf_counter() - start:.2f} s")
+    finally:
+        driver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""Export et réimport parallèles et reprenables du graphe de films.
+
+L'export écrit les jeux de données du loader (genres, movies, people,
+credits, users, ratings) en fichiers JSONL compressés et découpés :
+
+    snapshot/movies-movie-00003.jsonl.gz
+
+Chaque étiquette est découpée en plages d'identifiants internes de
+--partition-size ids. Chaque plage est lue par un lecteur du pool (une
+session en lecture par plage, seek par id), écrite dans un fichier
+temporaire puis renommée. Le point de reprise (checkpoint.json) garde les
+bornes des plages et les morceaux terminés : relancer la commande reprend
+là où elle s'était arrêtée ; --restart efface le point de reprise et les
+morceaux de l'export précédent. Les relations sont exportées avec le nœud de
+départ (crédits par film, notes par utilisateur) et HAS_GENRE avec les
+films. SIMILAR est dérivé et se recalcule après l'import.
+
+L'import recharge les morceaux avec le loader (UNWIND ... MERGE), jeu par
+jeu dans l'ordre du loader : les relations ont besoin de leurs deux nœuds
+et des MERGE concurrents sur les mêmes clés se gêneraient. Les morceaux
+chargés sont notés dans import-checkpoint.json ; seuls les morceaux listés
+par le point de reprise de l'export sont chargés, et un export interrompu
+est refusé sauf avec --allow-partial.
+
+    python snapshot.py export snapshot --workers 8
+    python snapshot.py import snapshot --clear
+"""
+
+import argparse
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from neo4j import GraphDatabase, READ_ACCESS
+from dotenv import load_dotenv
+
+from loader import CLEAR_GRAPH, DATASETS, DEFAULT_BATCH_SIZE, load_dataset
+from schema import apply_schema
+from similarity import build_similarity_index
+
+DEFAULT_PARTITION_SIZE = 10000
+DEFAULT_WORKERS = 4
+
+CHECKPOINT = "checkpoint.json"
+IMPORT_CHECKPOINT = "import-checkpoint.json"
+
+ID_BOUNDS = "MATCH (n:{label}) RETURN min(id(n)) AS low, max(id(n)) AS high"
+
+# Les plages sont lues par seek sur l'id interne, pas par un parcours de l'étiquette
+PARTITION = """
+UNWIND range($low, $high - 1) AS node_id
+MATCH (n:{label}) WHERE id(n) = node_id
+"""
+
+EXPORT_GENRES = PARTITION.format(label="Genre") + "RETURN n.name AS name"
+
+EXPORT_MOVIES = PARTITION.format(label="Movie") + """
+RETURN n.title AS title, n.year AS year, n.rating AS rating, n.description AS description,
+       [(n)-[:HAS_GENRE]->(g:Genre) | g.name] AS genres
+"""
+
+EXPORT_ACTORS = PARTITION.format(label="Actor") + """
+RETURN n.name AS name, 'Actor' AS label, n.nationality AS nationality
+"""
+
+EXPORT_DIRECTORS = PARTITION.format(label="Director") + "RETURN n.name AS name, 'Director' AS label"
+
+EXPORT_CREDITS = PARTITION.format(label="Movie") + """
+MATCH (p)-[r:ACTED_IN|DIRECTED]->(n)
+RETURN p.name AS person, n.title AS title, type(r) AS type, r.role AS role
+"""
+
+EXPORT_USERS = PARTITION.format(label="User") + """
+RETURN n.name AS name, n.age AS age, n.preferences AS preferences
+"""
+
+EXPORT_RATINGS = PARTITION.format(label="User") + """
+MATCH (n)-[l:LIKES]->(m:Movie)
+RETURN n.name AS user, m.title AS title, l.rating AS rating
+"""
+
+# Jeu de données du loader -> [(étiquette partitionnée, requête)]
+EXPORTS = {
+    "genres": [("Genre", EXPORT_GENRES)],
+    "movies": [("Movie", EXPORT_MOVIES)],
+    "people": [("Actor", EXPORT_ACTORS), ("Director", EXPORT_DIRECTORS)],
+    "credits": [("Movie", EXPORT_CREDITS)],
+    "users": [("User", EXPORT_USERS)],
+    "ratings": [("User", EXPORT_RATINGS)],
+}
+
+
+class Checkpoint:
+    """Chunks already written (or loaded), saved to JSON after each one"""
+
+    def __init__(self, path, settings: dict):
+        self.path = Path(path)
+        self.settings = settings
+        state = json.loads(self.path.read_text()) if self.path.exists() else {}
+        if state and state["settings"] != settings:
+            raise ValueError(f"{self.path} was written with {state['settings']}, not {settings}; "
+                             f"delete it (or use --restart) to start over")
+        # Étiquette -> [premier id, dernier id], figées au premier passage
+        self.bounds: dict[str, list] = state.get("bounds", {})
+        # Morceau -> nombre de lignes
+        self.done: dict[str, int] = state.get("done", {})
+
+    def mark(self, chunk: str, rows: int):
+        self.done[chunk] = rows
+        self.save()
+
+    def save(self):
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        temporary.write_text(json.dumps({"settings": self.settings, "bounds": self.bounds, "done": self.done}))
+        temporary.replace(self.path)
+
+
+def partitions(low: int | None, high: int | None, size: int) -> list[tuple[int, int]]:
+    """Split [low, high] into half-open id ranges of at most size ids"""
+    if low is None:
+        return []
+    return [(start, min(start + size, high + 1)) for start in range(low, high + 1, size)]
+
+
+def chunk_name(dataset: str, label: str, index: int) -> str:
+    return f"{dataset}-{label.lower()}-{index:05d}.jsonl.gz"
+
+
+def dataset_chunks(directory, name: str) -> list[Path]:
+    """Chunks of one dataset, limited to those recorded by the export checkpoint when there is one"""
+    directory = Path(directory)
+    if (directory / CHECKPOINT).exists():
+        # Un fichier absent du point de reprise vient d'un export précédent
+        done = json.loads((directory / CHECKPOINT).read_text())["done"]
+        return [directory / chunk for chunk in sorted(done) if chunk.startswith(f"{name}-")]
+    return sorted(directory.glob(f"{name}-*.jsonl.gz"))
+
+
+def missing_chunks(directory, exports: dict = EXPORTS) -> list[str]:
+    """Chunks the export checkpoint still expects, from its id bounds and partition size"""
+    directory = Path(directory)
+    if not (directory / CHECKPOINT).exists():
+        return []
+    state = json.loads((directory / CHECKPOINT).read_text())
+    size = state["settings"]["partition_size"]
+    missing = []
+    for dataset, sources in exports.items():
+        for label, _ in sources:
+            if label not in state["bounds"]:
+                # L'export s'est arrêté avant de lire les bornes de cette étiquette
+                missing.append(f"{dataset}-{label.lower()}-*")
+                continue
+            for index, _ in enumerate(partitions(*state["bounds"][label], size)):
+                chunk = chunk_name(dataset, label, index)
+                if chunk not in state["done"]:
+                    missing.append(chunk)
+    return missing
+
+
+def reset_export(directory):
+    """Delete the checkpoints and every chunk of a previous export"""
+    directory = Path(directory)
+    for name in (CHECKPOINT, IMPORT_CHECKPOINT):
+        (directory / name).unlink(missing_ok=True)
+    for dataset in EXPORTS:
+        for path in directory.glob(f"{dataset}-*.jsonl.gz*"):
+            path.unlink()
+
+
+def export_partition(driver, query: str, low: int, high: int, path: Path, database: str | None = None) -> int:
+    """Stream one id range into a gzipped JSONL chunk and return its number of rows"""
+    temporary = path.with_name(path.name + ".tmp")
+    rows = 0
+    with driver.session(database=database, default_access_mode=READ_ACCESS) as session, \
+            gzip.open(temporary, "wt", encoding="utf-8") as f:
+        for record in session.run(query, low=low, high=high):
+            f.write(json.dumps(record.data(), ensure_ascii=False) + "\n")
+            rows += 1
+    temporary.replace(path)
+    return rows
+
+
+def export_graph(driver, directory, partition_size: int = DEFAULT_PARTITION_SIZE, workers: int = DEFAULT_WORKERS,
+                 database: str | None = None, exports: dict = EXPORTS) -> dict[str, int]:
+    """Export every dataset with parallel readers, skipping the chunks of the checkpoint"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    checkpoint = Checkpoint(directory / CHECKPOINT, {"partition_size": partition_size})
+
+    pending = {}
+    for dataset, sources in exports.items():
+        for label, query in sources:
+            if label not in checkpoint.bounds:
+                with driver.session(database=database, default_access_mode=READ_ACCESS) as session:
+                    record = session.run(ID_BOUNDS.format(label=label)).single()
+                checkpoint.bounds[label] = [record["low"], record["high"]]
+                checkpoint.save()
+            for index, (low, high) in enumerate(partitions(*checkpoint.bounds[label], partition_size)):
+                chunk = chunk_name(dataset, label, index)
+                if chunk not in checkpoint.done:
+                    pending[chunk] = (query, low, high)
+
+    print(f"  📤 {len(pending)} morceaux à exporter ({len(checkpoint.done)} déjà faits), {workers} lecteurs")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(export_partition, driver, query, low, high, directory / chunk, database): chunk
+            for chunk, (query, low, high) in pending.items()
+        }
+        try:
+            for future in as_completed(futures):
+                checkpoint.mark(futures[future], future.result())
+        except BaseException:
+            # Les morceaux non notés seront refaits à la reprise
+            for future in futures:
+                future.cancel()
+            raise
+    elapsed = time.perf_counter() - start
+
+    counts = {
+        dataset: sum(rows for chunk, rows in checkpoint.done.items() if chunk.startswith(f"{dataset}-"))
+        for dataset in exports
+    }
+    exported = sum(checkpoint.done[chunk] for chunk in pending)
+    print(f"  ⏱️ {exported} lignes exportées en {elapsed:.2f} s "
+          f"({exported / elapsed if elapsed else 0:.0f} lignes/s)")
+    return counts
+
+
+def import_graph(driver, directory, batch_size: int = DEFAULT_BATCH_SIZE, database: str | None = None,
+                 allow_partial: bool = False, exports: dict = EXPORTS) -> dict[str, int]:
+    """Load the exported chunks in loader order, skipping the chunks already loaded
+
+    An interrupted export is refused unless allow_partial is set.
+    """
+    directory = Path(directory)
+    missing = missing_chunks(directory, exports)
+    if missing and not allow_partial:
+        raise ValueError(f"{directory} is an incomplete export ({len(missing)} chunks missing, e.g. {missing[0]}); "
+                         f"resume the export, or use --allow-partial to load it anyway")
+    checkpoint = Checkpoint(directory / IMPORT_CHECKPOINT, {"batch_size": batch_size})
+    counts = {}
+    start = time.perf_counter()
+    for name in DATASETS:
+        for path in dataset_chunks(directory, name):
+            if path.name not in checkpoint.done:
+                checkpoint.mark(path.name, load_dataset(driver, path, name, batch_size, database))
+            counts[name] = counts.get(name, 0) + checkpoint.done[path.name]
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    print(f"  ⏱️ {total} lignes importées en {elapsed:.2f} s ({total / elapsed if elapsed else 0:.0f} lignes/s)")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or re-import the movie graph as gzipped JSONL chunks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="Export the graph (resumes from the checkpoint)")
+    export.add_argument("directory")
+    export.add_argument("--partition-size", type=int, default=DEFAULT_PARTITION_SIZE,
+                        help=f"Internal ids per chunk (default {DEFAULT_PARTITION_SIZE})")
+    export.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Parallel readers (default {DEFAULT_WORKERS})")
+    export.add_argument("--restart", action="store_true",
+                        help="Delete the checkpoint and the chunks of a previous export, then export everything")
+    restore = commands.add_parser("import", help="Load an export (resumes from the checkpoint)")
+    restore.add_argument("directory")
+    restore.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                         help=f"Rows per write transaction (default {DEFAULT_BATCH_SIZE})")
+    restore.add_argument("--clear", action="store_true", help="Empty the database (in batches) before loading")
+    restore.add_argument("--restart", action="store_true", help="Ignore the checkpoint and load everything")
+    restore.add_argument("--allow-partial", action="store_true",
+                         help="Load an interrupted export, with only the chunks written so far")
+    args = parser.parse_args()
+
+    directory = Path(args.directory)
+    if args.command == "export" and args.restart:
+        # Avec une autre taille de partition, d'anciens morceaux resteraient sinon sur le disque
+        reset_export(directory)
+    elif args.command == "import" and (args.restart or args.clear):
+        (directory / IMPORT_CHECKPOINT).unlink(missing_ok=True)
+
+    load_dotenv()
+    driver = GraphDatabase.driver(
+        os.getenv("NEO4J_URI"),
+        auth=(os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD"))
+    )
+    database = os.getenv("NEO4J_DATABASE") or None
+    try:
+        if args.command == "export":
+            print(f"📦 Export vers {directory}...")
+            counts = export_graph(driver, directory, args.partition_size, args.workers, database)
+        else:
+            if args.clear:
+                print("🧹 Nettoyage de la base...")
+                with driver.session(database=database) as session:
+                    session.run(CLEAR_GRAPH).consume()
+            apply_schema(driver, database)
+            print(f"📥 Import de {directory}...")
+            counts = import_graph(driver, directory, args.batch_size, database, args.allow_partial)
+            print("🔗 Calcul des films similaires...")
+            build_similarity_index(driver, database=database)
+        for name, count in counts.items():
+            print(f"  {name}: {count} lignes")
+    finally:
+        driver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import asyncio
+import gzip
+from pathlib import Path
+
+import pytest
+
+from backends import InMemoryBackend, TokenIndex, _term_score
+
+DEMO_DATA = Path(__file__).parent / "data" / "demo"
+
+
+@pytest.fixture(scope="module")
+def backend():
+    return InMemoryBackend.from_directory(DEMO_DATA)
+
+
+def test_search_by_genre_is_sorted_and_paginated(backend):
+    """Test: Action movies come back by rating, one page at a time"""
+    first_page, total = asyncio.run(backend.search_movies({"genre": "Action", "limit": 2}))
+    second_page, _ = asyncio.run(backend.search_movies({"genre": "Action", "limit": 2, "offset": 2}))
+
+    assert total == 3
+    assert [m["title"] for m in first_page + second_page] == ["The Dark Knight", "Inception", "The Matrix"]
+    assert first_page[0]["actors"] == ["Christian Bale"]
+    assert first_page[0]["directors"] == ["Christopher Nolan"]
+
+
+def test_search_combines_actor_director_and_rating(backend):
+    """Test: actor/director filters match name terms by prefix or within a few edits, like the full-text index"""
+    movies, total = asyncio.run(backend.search_movies(
+        {"actor": "Bale", "director": "Nolan", "min_rating": 8.6}
+    ))
+
+    assert total == 1
+    assert movies[0]["title"] == "The Dark Knight"
+
+
+def test_user_preferences_and_genre_recommendations(backend):
+    """Test: Alice's favorites, and a recommendation sharing two genres"""
+    preferences = asyncio.run(backend.user_preferences("Alice"))
+    recommendations = asyncio.run(backend.recommend_by_genre("Alice"))
+
+    assert [p["title"] for p in preferences][:2] == ["Inception", "The Matrix"]
+    assert [r["title"] for r in recommendations] == ["The Dark Knight"]
+    assert recommendations[0]["genre_match_count"] == 2
+
+
+def test_movie_details(backend):
+    """Test: details include user ratings; unknown titles return None"""
+    movie = asyncio.run(backend.movie_details("Inception"))
+
+    assert movie["genres"] == ["Sci-Fi", "Action", "Thriller"]
+    assert movie["user_ratings"] == [{"user": "Alice", "rating": 5}]
+    assert asyncio.run(backend.movie_details("Unknown")) is None
+
+
+def test_fulltext_search_is_case_insensitive_and_typo_tolerant(backend):
+    """Test: free-text and person searches match lowercase, misspelled words"""
+    movies, total = asyncio.run(backend.search_movies({"query": "the matrx"}))
+    by_actor, _ = asyncio.run(backend.search_movies({"actor": "christian bal"}))
+
+    assert total == 1
+    assert movies[0]["title"] == "The Matrix"
+    assert [m["title"] for m in by_actor] == ["The Dark Knight", "The Prestige"]
+
+
+def test_closest_title_for_unknown_titles(backend):
+    """Test: a misspelled title resolves to its best fuzzy match"""
+    assert asyncio.run(backend.closest_title("interstelar")) == "Interstellar"
+    assert asyncio.run(backend.closest_title("zzzz")) is None
+
+
+def test_gzipped_datasets_are_found(tmp_path, backend):
+    """Test: a directory of .jsonl.gz files loads like the uncompressed one"""
+    for path in DEMO_DATA.glob("*.jsonl"):
+        (tmp_path / f"{path.name}.gz").write_bytes(gzip.compress(path.read_bytes()))
+
+    compressed = InMemoryBackend.from_directory(tmp_path)
+
+    assert compressed.movies.keys() == backend.movies.keys()
+    assert compressed.users.keys() == backend.users.keys()
+
+
+def test_token_index_expands_terms_like_a_vocabulary_scan():
+    """Test: the filtered vocabulary expansion finds the same tokens as scoring every token"""
+    words = ["matrix", "matrices", "metrics", "matter", "mat", "tram", "inception", "interception", "dark", "bark"]
+    index = TokenIndex((i, word) for i, word in enumerate(words))
+
+    for term in ["matrix", "matrx", "mat", "incepton", "drak", "dar", "ark"]:
+        expected = {word: _term_score(term, word) for word in words if _term_score(term, word)}
+        assert index.expand(term) == expected
+    assert index.scores("matrx") == {0: 0.5}
@@ -0,0 +1,32 @@
+from collaborative import CollaborativeRecommender
+
+RATINGS = [
+    ("Alice", "Inception", 5),
+    ("Alice", "The Matrix", 5),
+    ("Alice", "Interstellar", 4),
+    ("Bob", "The Dark Knight", 5),
+    ("Bob", "John Wick", 4),
+    ("Charlie", "Inception", 5),
+    ("Charlie", "The Dark Knight", 4),
+    ("Dana", "The Matrix", 3),
+]
+
+
+def test_recommends_unseen_movies_from_co_ratings():
+    """Test: Alice gets The Dark Knight through Charlie, never a movie she rated"""
+    model = CollaborativeRecommender(RATINGS)
+
+    recommendations = model.recommend("Alice")
+
+    assert [title for title, _ in recommendations] == ["The Dark Knight"]
+
+
+def test_batch_scoring_matches_single_user_scoring():
+    """Test: batched scoring gives the same results as one user at a time"""
+    model = CollaborativeRecommender(RATINGS)
+
+    batch = model.recommend_batch(["Bob", "Dana", "Unknown"], n=3)
+
+    assert set(batch) == {"Bob", "Dana"}
+    assert batch["Bob"] == model.recommend("Bob", n=3)
+    assert batch["Dana"] == model.recommend("Dana", n=3)
@@ -0,0 +1,72 @@
+import json
+import os
+import time
+
+os.environ.setdefault("NEO4J_URI", "bolt://localhost:7687")
+os.environ.setdefault("NEO4J_USER", "neo4j")
+os.environ.setdefault("NEO4J_PASSWORD", "password")
+
+import formats
+import server
+
+MOVIES = [
+    {
+        "title": f"Movie {i}",
+        "year": 1990 + i % 30,
+        "rating": round(5 + i % 50 / 10, 1),
+        "description": f"A long synthetic description of movie number {i}, the kind an LLM does not need to read",
+        "actors": [f"Actor {(i + k) % 20}" for k in range(4)],
+        "directors": [f"Director {i % 5}"],
+        "genres": [f"Genre {(i + k) % 6}" for k in range(2)],
+    }
+    for i in range(200)
+]
+
+RENDERERS = {
+    "text": lambda: server.format_search_results(MOVIES, len(MOVIES), 0),
+    "compact": lambda: formats.compact_search_results(MOVIES, len(MOVIES), 0, False),
+    "json": lambda: formats.columnar(MOVIES, total=len(MOVIES), offset=0),
+}
+
+
+def test_compact_and_json_are_smaller_and_measured():
+    """Test: output size and formatting time per mode, compact and json well below text"""
+    sizes, timings = {}, {}
+    for mode, render in RENDERERS.items():
+        start = time.perf_counter()
+        for _ in range(20):
+            output = render()
+        timings[mode] = (time.perf_counter() - start) / 20 * 1000
+        sizes[mode] = len(output.encode())
+        print(f"{mode:8} {sizes[mode]:8} bytes  {timings[mode]:.3f} ms")
+
+    assert sizes["compact"] < sizes["text"] * 0.6
+    assert sizes["json"] < sizes["text"] * 0.5
+
+
+def test_json_interns_names_and_decodes_back():
+    """Test: people and genres are listed once and rows reference them by index"""
+    payload = json.loads(formats.columnar(MOVIES[:3], total=3, offset=0))
+
+    assert payload["total"] == 3
+    assert "description" not in payload["columns"]
+    assert len(payload["people"]) == len(set(payload["people"]))
+    row = dict(zip(payload["columns"], payload["rows"][0]))
+    assert [payload["people"][i] for i in row["actors"]] == MOVIES[0]["actors"]
+    assert [payload["genres"][i] for i in row["genres"]] == MOVIES[0]["genres"]
+
+
+def test_descriptions_only_when_requested():
+    """Test: compact and json drop descriptions unless include_description is set"""
+    movie = MOVIES[:1]
+
+    assert movie[0]["description"] not in formats.compact_search_results(movie, 1, 0, False)
+    assert movie[0]["description"] in formats.compact_search_results(movie, 1, 0, True)
+    assert "description" in json.loads(formats.columnar(movie, include_description=True))["columns"]
+
+
+def test_missing_description_is_rendered_as_a_dash():
+    """Test: a movie without description still renders when descriptions are requested"""
+    movie = [{**MOVIES[0], "description": None}]
+
+    assert formats.compact_search_results(movie, 1, 0, True).endswith(" | -")
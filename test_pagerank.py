@@ -0,0 +1,65 @@
+import asyncio
+from pathlib import Path
+
+from backends import InMemoryBackend
+from pagerank import GraphWalkRecommender, evaluate
+
+DEMO_DATA = Path(__file__).parent / "data" / "demo"
+
+EDGES = [
+    ("Heat", "LIKES", "Alice", 1.0),
+    ("Heat", "ACTED_IN", "Al Pacino", 1.0),
+    ("Heat", "HAS_GENRE", "Crime", 1.0),
+    ("Scarface", "ACTED_IN", "Al Pacino", 1.0),
+    ("Scarface", "HAS_GENRE", "Crime", 1.0),
+    ("Casino", "HAS_GENRE", "Crime", 1.0),
+    ("Amelie", "HAS_GENRE", "Romance", 1.0),
+    ("Amelie", "LIKES", "Bob", 1.0),
+]
+
+
+def test_walk_ranks_shared_cast_above_shared_genre():
+    """Test: a movie sharing an actor and a genre beats one sharing only the genre; unrelated movies never show"""
+    model = GraphWalkRecommender(EDGES)
+
+    recommendations = model.recommend("Alice", n=5)
+
+    assert [title for title, _ in recommendations] == ["Scarface", "Casino"]
+
+
+def test_results_are_cached_per_user_and_walks_are_bounded():
+    """Test: a second call is served from the cache; max_iterations caps the walk"""
+    model = GraphWalkRecommender(EDGES, max_iterations=3)
+
+    first = model.recommend("Alice")
+    iterations = model.iterations
+    second = model.recommend("Alice")
+
+    assert iterations <= 3
+    assert model.iterations == iterations
+    assert first is second
+    assert model.recommend("Unknown") == []
+
+
+def test_evaluation_reports_both_strategies():
+    """Test: the evaluation hides one like per user and reports hit rate and latency per strategy"""
+    backend = InMemoryBackend.from_directory(DEMO_DATA)
+
+    report = asyncio.run(evaluate(backend))
+
+    assert report["users"] >= 1
+    for strategy in ("genre", "pagerank"):
+        assert 0 <= report[strategy]["hit_rate"] <= 1
+        assert report[strategy]["mean_ms"] >= 0
+
+
+def test_batch_larger_than_the_cache_returns_every_user():
+    """Test: users evicted from the cache during a batch still get their recommendations"""
+    edges = EDGES + [("Casino", "LIKES", f"User {i}", 1.0) for i in range(6)]
+    model = GraphWalkRecommender(edges, cache_size=3)
+
+    recommendations = model.recommend_batch([f"User {i}" for i in range(6)])
+
+    assert sorted(recommendations) == [f"User {i}" for i in range(6)]
+    assert all(recommendations.values())
+    assert len(model._cache) == 3
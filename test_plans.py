@@ -0,0 +1,108 @@
+import json
+
+import plans
+from plans import StubPlanProvider, compare, record
+
+
+def plan(operator, db_hits=None, *children, estimated_rows=1.0):
+    return {"operatorType": f"{operator}@neo4j", "args": {"EstimatedRows": estimated_rows},
+            "dbHits": db_hits, "rows": 1, "children": list(children)}
+
+
+SEEK = plans.normalize_plan(plan("ProduceResults", 0, plan("Projection", 2, plan("NodeUniqueIndexSeek", 2))))
+SCAN = plans.normalize_plan(plan("ProduceResults", 0, plan("Filter", 300, plan("AllNodesScan", 301))))
+CATALOG = {"get_movie_details": ("MATCH (m:Movie {title: $title}) RETURN m", {"title": "Inception"})}
+
+
+def test_normalized_plan_keeps_operators_estimates_and_db_hits():
+    """Test: the stored tree drops the runtime suffix and sums db hits over the tree"""
+    baseline = record(StubPlanProvider({"get_movie_details": SEEK}), CATALOG)
+    entry = baseline["queries"]["get_movie_details"]
+
+    assert entry["operators"] == ["ProduceResults", "Projection", "NodeUniqueIndexSeek"]
+    assert entry["db_hits"] == 4
+    assert entry["estimated_rows"] == 1.0
+    assert compare(baseline, baseline) == []
+
+
+def test_forbidden_operator_and_db_hit_regression_fail(tmp_path):
+    """Test: an index seek turned into an AllNodesScan fails on both checks, via a stored baseline"""
+    path = tmp_path / "baseline.json"
+    path.write_text(json.dumps(record(StubPlanProvider({"get_movie_details": SEEK}), CATALOG)))
+    baseline = json.loads(path.read_text())
+
+    current = record(StubPlanProvider({"get_movie_details": SCAN}), CATALOG)
+    failures = compare(current, baseline)
+
+    assert failures == [
+        "get_movie_details: forbidden operator(s) AllNodesScan",
+        "get_movie_details: 601 db hits, baseline 4 (+20% allowed)",
+    ]
+
+
+def test_small_db_hit_changes_are_tolerated():
+    """Test: growth within the threshold or below the absolute floor does not fail"""
+    baseline = record(StubPlanProvider({"get_movie_details": SEEK}), CATALOG)
+    grown = plans.normalize_plan(plan("ProduceResults", 0, plan("Projection", 6, plan("NodeUniqueIndexSeek", 6))))
+
+    assert compare(record(StubPlanProvider({"get_movie_details": grown}), CATALOG), baseline) == []
+
+
+def test_catalog_covers_every_tool_query():
+    """Test: the profiled catalog includes the search, recommendation and details templates"""
+    texts = {query for query, _ in plans.CATALOG.values()}
+
+    assert {plans.queries.GET_USER_PREFERENCES, plans.queries.RECOMMEND_MOVIES,
+            plans.queries.RECOMMEND_SIMILAR, plans.queries.GET_MOVIE_DETAILS} <= texts
+
+
+def test_search_templates_have_no_independent_clauses():
+    """Test: a second person lookup imports the first, and the anchor starts from the lookups"""
+    for filters, query in plans.queries.SEARCH_MOVIES.items():
+        clauses = [line.strip() for line in query.strip().splitlines()]
+        lookups = [clause for clause in clauses if clause.startswith("CALL {")]
+        assert all(lookup.startswith("CALL { WITH actors ") for lookup in lookups[1:]), filters
+        if lookups:
+            # Un MATCH indépendant après les recherches serait un CartesianProduct
+            assert not clauses[len(lookups)].startswith("MATCH"), filters
+
+
+def test_queries_missing_from_the_baseline_fail():
+    """Test: a catalog query without a recorded baseline is reported instead of silently passing"""
+    current = record(StubPlanProvider({"get_movie_details": SEEK}), CATALOG)
+
+    assert compare(current, None) == ["get_movie_details: not in the baseline (record it with --update)"]
+    assert compare(current, {"queries": {}}) == compare(current, None)
+
+
+class RecordingProvider(StubPlanProvider):
+    def __init__(self, plans):
+        super().__init__(plans)
+        self.profiled = {}
+
+    def plan(self, name, query, params, profile):
+        self.profiled[name] = profile
+        return super().plan(name, query, params, profile)
+
+
+def test_write_queries_are_only_explained():
+    """Test: rate_movies is in the catalog but never run under PROFILE"""
+    provider = RecordingProvider({name: SEEK for name in plans.CATALOG})
+
+    record(provider)
+
+    assert provider.profiled["rate_movies"] is False
+    assert provider.profiled["get_movie_details"] is True
+
+
+def test_missing_baseline_only_checks_forbidden_operators(tmp_path, monkeypatch, capsys):
+    """Test: without a recorded baseline the check passes with a notice instead of failing"""
+    stub = tmp_path / "stub.json"
+    stub.write_text(json.dumps(record(StubPlanProvider({name: SEEK for name in plans.CATALOG}))))
+    monkeypatch.setattr("sys.argv", ["plans.py", "--stub", str(stub), "--baseline", str(tmp_path / "missing.json")])
+    plans.main()
+    assert "pas encore activé" in capsys.readouterr().out
+
+    monkeypatch.setattr("sys.argv", ["plans.py", "--stub", str(tmp_path / "missing.json")])
+    plans.main()
+    assert "pas encore activé" in capsys.readouterr().out
@@ -0,0 +1,147 @@
+import os
+import random
+from itertools import combinations
+
+import pytest
+from neo4j import GraphDatabase
+from dotenv import load_dotenv
+
+import queries
+from schema import apply_schema
+
+load_dotenv()
+
+# Préfixe des données générées, supprimées à la fin du test
+PREFIX = "RegressionTest"
+
+# Forme historique de search_movies (OPTIONAL MATCH en chaîne), filtres
+# appliqués après la collecte : sert de référence pour la réécriture
+REFERENCE_SEARCH = """
+MATCH (m:Movie)
+OPTIONAL MATCH (m)<-[:ACTED_IN]-(a:Actor)
+OPTIONAL MATCH (m)<-[:DIRECTED]-(d:Director)
+OPTIONAL MATCH (m)-[:HAS_GENRE]->(g:Genre)
+WITH m,
+     collect(DISTINCT a.name) as actors,
+     collect(DISTINCT d.name) as directors,
+     collect(DISTINCT g.name) as genres
+WHERE ($genre IS NULL OR $genre IN genres)
+  AND ($actor IS NULL OR any(x IN actors WHERE x CONTAINS $actor))
+  AND ($director IS NULL OR any(x IN directors WHERE x CONTAINS $director))
+  AND ($min_rating IS NULL OR m.rating >= $min_rating)
+RETURN m.title as title,
+       m.year as year,
+       m.rating as rating,
+       m.description as description,
+       actors,
+       directors,
+       genres
+"""
+
+# Filtres couverts par la requête de référence (la recherche texte n'y figure pas)
+REFERENCE_FILTERS = ("genre", "actor", "director", "min_rating")
+
+FILTER_VALUES = {
+    "genre": f"{PREFIX} Genre 2",
+    "actor": f"{PREFIX} Actor 1",
+    "director": f"{PREFIX} Director 3",
+    "min_rating": 6.5,
+}
+
+
+@pytest.fixture(scope="module")
+def driver():
+    if not os.getenv("NEO4J_URI"):
+        pytest.skip("NEO4J_URI is not set")
+    driver = GraphDatabase.driver(
+        os.getenv("NEO4J_URI"),
+        auth=(os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD"))
+    )
+    try:
+        driver.verify_connectivity()
+    except Exception as exc:
+        driver.close()
+        pytest.skip(f"Neo4j is not reachable: {exc}")
+    yield driver
+    driver.close()
+
+
+@pytest.fixture(scope="module")
+def generated_graph(driver):
+    """Generate a random catalog with large casts and several genres per movie"""
+    rng = random.Random(42)
+    apply_schema(driver)
+    movies = [
+        {"title": f"{PREFIX} Movie {i}", "year": 1980 + i % 40,
+         "rating": round(rng.uniform(4, 9.5), 1), "description": f"Movie number {i}"}
+        for i in range(80)
+    ]
+    acted_in = [
+        {"actor": f"{PREFIX} Actor {a}", "title": movie["title"]}
+        for movie in movies
+        for a in rng.sample(range(40), rng.randint(0, 12))
+    ]
+    directed = [
+        {"director": f"{PREFIX} Director {d}", "title": movie["title"]}
+        for movie in movies
+        for d in rng.sample(range(8), rng.randint(0, 2))
+    ]
+    has_genre = [
+        {"genre": f"{PREFIX} Genre {g}", "title": movie["title"]}
+        for movie in movies
+        for g in rng.sample(range(6), rng.randint(0, 3))
+    ]
+
+    with driver.session() as session:
+        session.run("UNWIND $rows AS row CREATE (:Movie {title: row.title, year: row.year, "
+                    "rating: row.rating, description: row.description})", rows=movies)
+        session.run("UNWIND range(0, 39) AS i CREATE (:Actor {name: $prefix + ' Actor ' + i})",
+                    prefix=PREFIX)
+        session.run("UNWIND range(0, 7) AS i CREATE (:Director {name: $prefix + ' Director ' + i})",
+                    prefix=PREFIX)
+        session.run("UNWIND range(0, 5) AS i CREATE (:Genre {name: $prefix + ' Genre ' + i})",
+                    prefix=PREFIX)
+        session.run("UNWIND $rows AS row MATCH (a:Actor {name: row.actor}), (m:Movie {title: row.title}) "
+                    "CREATE (a)-[:ACTED_IN]->(m)", rows=acted_in)
+        session.run("UNWIND $rows AS row MATCH (d:Director {name: row.director}), (m:Movie {title: row.title}) "
+                    "CREATE (d)-[:DIRECTED]->(m)", rows=directed)
+        session.run("UNWIND $rows AS row MATCH (g:Genre {name: row.genre}), (m:Movie {title: row.title}) "
+                    "CREATE (m)-[:HAS_GENRE]->(g)", rows=has_genre)
+        session.run("CALL db.awaitIndexes(300)").consume()
+    yield
+    with driver.session() as session:
+        session.run("MATCH (n) WHERE n.title STARTS WITH $prefix OR n.name STARTS WITH $prefix "
+                    "DETACH DELETE n", prefix=PREFIX)
+
+
+def _normalize(records):
+    return sorted(
+        (r["title"], r["year"], r["rating"], r["description"],
+         sorted(set(r["actors"])), sorted(set(r["directors"])), sorted(set(r["genres"])))
+        for r in records
+    )
+
+
+@pytest.mark.parametrize("filters", [
+    filters
+    for size in range(len(REFERENCE_FILTERS) + 1)
+    for filters in combinations(REFERENCE_FILTERS, size)
+])
+def test_search_movies_matches_reference(driver, generated_graph, filters):
+    """Test: the anchored search returns the same movies as the fan-out query"""
+    arguments = {f: FILTER_VALUES[f] for f in filters}
+    query, count_query, params = queries.search_movies_query(
+        {**arguments, "limit": queries.SEARCH_MAX_LIMIT}
+    )
+    reference_params = {f: arguments.get(f) for f in REFERENCE_FILTERS}
+
+    with driver.session() as session:
+        expected = [dict(r) for r in session.run(REFERENCE_SEARCH, reference_params)]
+        total = session.run(count_query, params).single()["total"]
+        actual = []
+        for offset in range(0, total, queries.SEARCH_MAX_LIMIT):
+            actual.extend(dict(r) for r in session.run(query, {**params, "offset": offset}))
+
+    assert total == len(expected)
+    assert _normalize(actual) == _normalize(expected)
+    assert [r["rating"] for r in actual] == sorted((r["rating"] for r in actual), reverse=True)
@@ -0,0 +1,97 @@
+import asyncio
+
+from ratings import RatingBuffer
+
+
+class FakeWriter:
+    def __init__(self, delay=0.0, fail=False):
+        self.batches = []
+        self.delay = delay
+        self.fail = fail
+
+    async def __call__(self, rows):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("Neo4j is down")
+        self.batches.append(rows)
+        return len(rows)
+
+
+def rating(i, value=4):
+    return {"user": f"User {i % 3}", "title": f"Movie {i}", "rating": value}
+
+
+def test_flushes_in_batches_once_the_size_threshold_is_reached():
+    """Test: reaching flush_size writes the buffer in flush_size batches, in the background"""
+    writer = FakeWriter()
+    flushed = []
+    buffer = RatingBuffer(writer, on_flush=flushed.append, flush_size=3, flush_interval=60)
+
+    async def scenario():
+        await buffer.add([rating(i) for i in range(2)])
+        assert writer.batches == []
+        await buffer.add([rating(i) for i in range(2, 7)])
+        await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+
+    assert [len(batch) for batch in writer.batches] == [3, 3, 1]
+    assert len(flushed) == 3
+    assert buffer.stats()["pending"] == 0
+    assert buffer.stats()["flushed"] == 7
+
+
+def test_flushes_on_the_time_threshold_and_on_close():
+    """Test: a lone rating is written after flush_interval; close writes what is left"""
+    writer = FakeWriter()
+    buffer = RatingBuffer(writer, flush_size=100, flush_interval=0.05)
+
+    async def scenario():
+        buffer.start()
+        await buffer.add([rating(1)])
+        await asyncio.sleep(0.1)
+        written_by_timer = len(writer.batches)
+        await buffer.add([rating(2)])
+        await buffer.close()
+        return written_by_timer
+
+    assert asyncio.run(scenario()) == 1
+    assert [batch[0]["title"] for batch in writer.batches] == ["Movie 1", "Movie 2"]
+
+
+def test_full_buffer_applies_backpressure():
+    """Test: callers wait for a flush instead of growing the buffer past max_pending"""
+    writer = FakeWriter(delay=0.01)
+    buffer = RatingBuffer(writer, flush_size=100, flush_interval=60, max_pending=4)
+
+    async def scenario():
+        sizes = []
+        for i in range(10):
+            sizes.append(await buffer.add([rating(i)]))
+        await buffer.close()
+        return sizes
+
+    sizes = asyncio.run(scenario())
+
+    assert max(sizes) == 4
+    assert buffer.stats()["backpressure_waits"] == 2
+    assert sum(len(batch) for batch in writer.batches) == 10
+
+
+def test_failed_flush_keeps_ratings_and_last_rating_wins():
+    """Test: a failed write leaves the ratings pending; re-rating a movie replaces the queued value"""
+    writer = FakeWriter(fail=True)
+    buffer = RatingBuffer(writer, flush_size=100, flush_interval=60)
+
+    async def scenario():
+        await buffer.add([rating(1, 2), rating(1, 5)])
+        try:
+            await buffer.flush()
+        except ConnectionError:
+            pass
+        writer.fail = False
+        await buffer.flush()
+
+    asyncio.run(scenario())
+
+    assert writer.batches == [[{"user": "User 1", "title": "Movie 1", "rating": 5}]]
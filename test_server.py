@@ -0,0 +1,506 @@
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("NEO4J_URI", "bolt://localhost:7687")
+os.environ.setdefault("NEO4J_USER", "neo4j")
+os.environ.setdefault("NEO4J_PASSWORD", "password")
+
+import neo4j
+import pytest
+
+import backends
+import queries
+import server
+from backends import Neo4jBackend
+from benchmark import generate_graph
+from metrics import Metrics
+from ratings import RatingBuffer
+
+QUERY_DELAY = 0.2
+
+RECOMMENDATION = {
+    "title": "The Dark Knight",
+    "rating": 9.0,
+    "year": 2008,
+    "description": "Batman faces the Joker",
+    "shared_genres": ["Action"],
+    "genre_match_count": 1,
+    "actors": ["Christian Bale"],
+    "directors": ["Christopher Nolan"],
+}
+
+
+class FakeSummary:
+    result_available_after = 1
+    result_consumed_after = 2
+    profile = None
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+        self.consumed = 0
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for row in self._rows:
+            self.consumed += 1
+            yield row
+
+    async def single(self):
+        return self._rows[0] if self._rows else None
+
+    async def consume(self):
+        return FakeSummary()
+
+
+class FakeSession:
+    def __init__(self, rows, calls, config):
+        self._rows = rows
+        self._calls = calls
+        self.config = config
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def run(self, query, parameters=None, **kwargs):
+        self._calls.append((query, parameters))
+        # Simule un aller-retour Neo4j lent
+        await asyncio.sleep(QUERY_DELAY)
+        return FakeResult(self._rows)
+
+    async def execute_read(self, work):
+        self.config["tx_timeout"] = getattr(work, "timeout", None)
+        return await work(FakeTransaction(self))
+
+
+class FakeTransaction:
+    def __init__(self, session):
+        self._session = session
+
+    async def run(self, query, parameters=None, **kwargs):
+        # Comme AsyncTransactionBase.run du driver
+        if isinstance(query, neo4j.Query):
+            raise TypeError("Query object is only supported for session.run")
+        return await self._session.run(query, parameters, **kwargs)
+
+
+class FakeDriver:
+    def __init__(self, rows):
+        self._rows = rows
+        self.calls = []
+        self.sessions = []
+        self.verified = False
+
+    async def verify_connectivity(self):
+        self.verified = True
+
+    def session(self, **kwargs):
+        self.sessions.append(kwargs)
+        return FakeSession(self._rows, self.calls, kwargs)
+
+
+def use_fake_driver(monkeypatch, rows, max_concurrent_queries=8):
+    fake = FakeDriver(rows)
+    monkeypatch.setattr(server, "backend", Neo4jBackend(fake, max_concurrent_queries))
+    return fake
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(server, "result_cache", server.ResultCache(16, 60))
+    monkeypatch.setattr(server, "single_flight", server.SingleFlight())
+
+
+def test_parallel_recommendations_do_not_block(monkeypatch):
+    """Test: N parallel recommend_movies calls take about as long as one"""
+    use_fake_driver(monkeypatch, [RECOMMENDATION])
+    users = [f"User {i}" for i in range(8)]
+
+    async def scenario():
+        start = time.perf_counter()
+        await server.call_tool("recommend_movies", {"user_name": users[0]})
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*[
+            server.call_tool("recommend_movies", {"user_name": user})
+            for user in users
+        ])
+        return single, time.perf_counter() - start, results
+
+    single, parallel, results = asyncio.run(scenario())
+
+    assert len(results) == len(users)
+    assert all("The Dark Knight" in r[0].text for r in results)
+    assert parallel < single * 2
+
+
+def test_concurrency_limit_is_respected(monkeypatch):
+    """Test: the concurrency limit caps how many queries run at once"""
+    use_fake_driver(monkeypatch, [RECOMMENDATION], max_concurrent_queries=2)
+
+    async def scenario():
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            server.call_tool("recommend_movies", {"user_name": f"User {i}"})
+            for i in range(4)
+        ])
+        return time.perf_counter() - start
+
+    elapsed = asyncio.run(scenario())
+
+    # 4 requêtes, 2 à la fois : au moins deux vagues successives
+    assert elapsed >= QUERY_DELAY * 2
+
+
+def test_search_uses_parameterized_template(monkeypatch):
+    """Test: filter values are sent as $params, never spliced into the Cypher"""
+    fake = use_fake_driver(monkeypatch, [])
+    arguments = {"genre": "Sci-Fi", "actor": "Keanu' OR 1=1 //", "min_rating": 8}
+
+    asyncio.run(server.call_tool("search_movies", arguments))
+    asyncio.run(server.call_tool("search_movies", {**arguments, "actor": "Bale"}))
+
+    pages = [call for call in fake.calls if "LIMIT $limit" in call[0]]
+    (first_query, first_params), (second_query, _) = pages
+    assert first_query == second_query
+    assert "Keanu" not in first_query
+    assert first_params == {**arguments, "actor": queries.fulltext_query(arguments["actor"]), "limit": 5, "offset": 0}
+
+
+def test_search_pagination_is_pushed_into_cypher(monkeypatch):
+    """Test: limit/offset travel as parameters of a LIMIT clause, with a separate count"""
+    fake = use_fake_driver(monkeypatch, [])
+
+    asyncio.run(server.call_tool("search_movies", {"genre": "Action", "limit": 500, "offset": 10}))
+
+    (page_query, page_params), (count_query, _) = sorted(fake.calls, key=lambda c: "count(" in c[0])
+    assert "LIMIT $limit" in page_query
+    assert "count(m)" in count_query
+    assert page_params["limit"] == 50
+    assert page_params["offset"] == 10
+
+
+def test_read_tools_are_cached_until_a_write(monkeypatch):
+    """Test: identical calls hit the cache, a graph write invalidates it"""
+    fake = use_fake_driver(monkeypatch, [RECOMMENDATION])
+
+    async def scenario():
+        await server.call_tool("recommend_movies", {"user_name": "Bob"})
+        await server.call_tool("recommend_movies", {"user_name": "Bob"})
+        calls_before_write = len(fake.calls)
+        server.bump_graph_version()
+        await server.call_tool("recommend_movies", {"user_name": "Bob"})
+        return calls_before_write
+
+    calls_before_write = asyncio.run(scenario())
+
+    assert calls_before_write == 1
+    assert len(fake.calls) == 2
+    assert server.result_cache.stats()["hits"] == 1
+
+
+def test_cache_evicts_least_recently_used():
+    """Test: the cache stays bounded and evicts the oldest entry"""
+    cache = server.ResultCache(max_entries=2, ttl=60)
+    cache.put("a", 0, 1)
+    cache.put("b", 0, 2)
+    cache.get("a", 0)
+    cache.put("c", 0, 3)
+
+    assert cache.get("b", 0) is None
+    assert cache.get("a", 0) == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_query_graph_streams_read_only_and_truncates(monkeypatch):
+    """Test: query_graph stops at the row cap and reports the truncation"""
+    fake = use_fake_driver(monkeypatch, [{"n": i} for i in range(10_000)])
+    monkeypatch.setattr(server, "QUERY_GRAPH_MAX_ROWS", 3)
+
+    response = asyncio.run(server.call_tool("query_graph", {"query": "MATCH (n) RETURN n"}))
+
+    assert response[0].text.startswith("Query results (3 rows)")
+    assert "Results truncated after 3 rows" in response[0].text
+    assert "consumed after 2 ms" in response[0].text
+    assert fake.sessions[0]["default_access_mode"] == "READ"
+    assert fake.sessions[0]["fetch_size"] == server.QUERY_GRAPH_FETCH_SIZE
+    assert fake.sessions[0]["tx_timeout"] == server.QUERY_GRAPH_TIMEOUT
+
+
+def test_batch_recommendations_use_one_round_trip(monkeypatch):
+    """Test: a batch is one UNWIND query, and each item reads like the single tool"""
+    fake = use_fake_driver(monkeypatch, [{**RECOMMENDATION, "key": "Alice"}, {**RECOMMENDATION, "key": "Bob"}])
+    batch = asyncio.run(server.call_tool("recommend_movies_batch", {"user_names": ["Alice", "Bob"]}))
+
+    assert len(fake.calls) == 1
+    assert "UNWIND $keys" in fake.calls[0][0]
+    assert fake.calls[0][1] == {"keys": ["Alice", "Bob"]}
+
+    use_fake_driver(monkeypatch, [RECOMMENDATION])
+    single = asyncio.run(server.call_tool("recommend_movies", {"user_name": "Bob"}))
+    assert batch[1].text == single[0].text
+
+
+def test_tool_phases_are_timed_and_exposed(monkeypatch):
+    """Test: each phase of a call lands in the metrics, readable through server_stats"""
+    fresh = Metrics()
+    monkeypatch.setattr(server, "metrics", fresh)
+    monkeypatch.setattr(backends, "metrics", fresh)
+    use_fake_driver(monkeypatch, [RECOMMENDATION])
+
+    asyncio.run(server.call_tool("recommend_movies", {"user_name": "Bob"}))
+    text = asyncio.run(server.call_tool("server_stats", {}))[0].text
+    prometheus = asyncio.run(server.call_tool("server_stats", {"prometheus": True}))[0].text
+
+    phases = {phase for tool, phase in fresh.histograms if tool == "recommend_movies"}
+    assert phases == {"total", "db", "materialize", "server_available", "server_consumed", "format"}
+    assert fresh.counters["recommend_movies", "rows"] == 1
+    assert "recommend_movies: 1 calls" in text
+    assert 'mcp_tool_phase_ms_count{tool="recommend_movies",phase="db"} 1' in prometheus
+
+
+def test_unknown_tools_are_rejected_before_metrics(monkeypatch):
+    """Test: an unknown tool name creates no series, and label values are escaped"""
+    fresh = Metrics()
+    monkeypatch.setattr(server, "metrics", fresh)
+
+    with pytest.raises(ValueError, match="Unknown tool"):
+        asyncio.run(server.call_tool('evil"}\\', {}))
+
+    assert not fresh.histograms and not fresh.counters
+    fresh.increment('a"b\\c', "calls")
+    assert 'tool="a\\"b\\\\c"' in fresh.render_prometheus()
+
+
+def test_query_graph_is_only_offered_by_cypher_backends(monkeypatch):
+    """Test: the in-memory backend does not advertise query_graph, and calls to it are rejected"""
+    monkeypatch.setattr(server, "backend", backends.InMemoryBackend.from_directory(server.MEMORY_DATA_DIR))
+
+    names = {tool.name for tool in asyncio.run(server.list_tools())}
+
+    assert "query_graph" not in names and "search_movies" in names
+    with pytest.raises(ValueError, match="Unknown tool"):
+        asyncio.run(server.call_tool("query_graph", {"query": "RETURN 1"}))
+
+
+def test_pool_is_warmed_pinned_and_reported(monkeypatch):
+    """Test: startup verifies and warms the pool on the pinned database; waits show in server_stats"""
+    async def no_schema(driver, database=None):
+        return []
+
+    fake = FakeDriver([{"title": "Inception"}])
+    backend = Neo4jBackend(fake, 2, database="movies", max_pool_size=10, warm_connections=2)
+    monkeypatch.setattr(server, "backend", backend)
+    monkeypatch.setattr(backends.schema, "apply_schema_async", no_schema)
+
+    asyncio.run(backend.prepare())
+    assert fake.verified
+    assert [session["database"] for session in fake.sessions] == ["movies", "movies"]
+
+    async def run_all():
+        await asyncio.gather(*[backend.run_query("RETURN 1") for _ in range(4)])
+
+    asyncio.run(run_all())
+    stats = backend.pool_stats()
+    text = asyncio.run(server.call_tool("server_stats", {}))[0].text
+
+    assert stats["peak_sessions"] == 2
+    assert stats["sessions_opened"] == 6
+    assert stats["slot_waits"] == 2
+    assert stats["active_sessions"] == 0
+    assert "Pool (movies): 0/2 sessions active, peak 2, 6 opened, max pool size 10, 2 waits" in text
+
+
+def test_movie_details_fall_back_to_closest_title(monkeypatch):
+    """Test: get_movie_details answers with the best fuzzy hit instead of not found"""
+    monkeypatch.setattr(server, "backend", backends.InMemoryBackend.from_directory(server.MEMORY_DATA_DIR))
+
+    text = asyncio.run(server.call_tool("get_movie_details", {"title": "the dark knigt"}))[0].text
+
+    assert text.startswith("No movie titled 'the dark knigt', showing the closest match.")
+    assert "**The Dark Knight** (2008)" in text
+
+
+def test_identical_concurrent_calls_share_one_query(monkeypatch):
+    """Test: under a burst of identical calls, one query runs and the rest are counted as saved"""
+    fake = use_fake_driver(monkeypatch, [{"title": "Inception", "year": 2010, "rating": 8.8, "description": "",
+                                          "actors": [], "directors": [], "genres": [], "user_ratings": []}])
+    monkeypatch.setattr(server, "CACHE_DISABLED_TOOLS", {"get_movie_details"})
+
+    async def burst():
+        return await asyncio.gather(*[
+            server.call_tool("get_movie_details", {"title": "Inception" if i % 10 else "Matrix"})
+            for i in range(100)
+        ])
+
+    responses = asyncio.run(burst())
+
+    assert len(fake.calls) == 2
+    assert server.single_flight.stats() == {"in_flight": 0, "executions": 2, "coalesced": 98}
+    assert responses[1] is responses[2]
+    text = asyncio.run(server.call_tool("server_stats", {}))[0].text
+    assert "Single-flight: 0 in flight, 2 executions, 98 calls coalesced" in text
+
+
+def test_cancelled_caller_does_not_cancel_shared_query(monkeypatch):
+    """Test: the leader's cancellation leaves followers their result; the last one out cancels the query"""
+    fake = use_fake_driver(monkeypatch, [RECOMMENDATION])
+
+    async def scenario():
+        arguments = {"user_name": "Alice", "strategy": "genre"}
+        leader = asyncio.create_task(server.call_tool("recommend_movies", arguments))
+        follower = asyncio.create_task(server.call_tool("recommend_movies", arguments))
+        await asyncio.sleep(QUERY_DELAY / 4)
+        leader.cancel()
+        response = await follower
+
+        alone = asyncio.create_task(server.call_tool("recommend_movies", {"user_name": "Bob", "strategy": "genre"}))
+        await asyncio.sleep(QUERY_DELAY / 4)
+        alone.cancel()
+        await asyncio.sleep(0)
+        return leader, response, alone
+
+    leader, response, alone = asyncio.run(scenario())
+
+    assert leader.cancelled() and alone.cancelled()
+    assert "The Dark Knight" in response[0].text
+    assert len(fake.calls) == 2
+    assert server.single_flight.stats()["in_flight"] == 0
+
+
+def test_query_graph_is_never_coalesced(monkeypatch):
+    """Test: identical query_graph calls each run their own query"""
+    fake = use_fake_driver(monkeypatch, [{"n": 1}])
+
+    async def burst():
+        await asyncio.gather(*[server.call_tool("query_graph", {"query": "RETURN 1 as n"}) for _ in range(3)])
+
+    asyncio.run(burst())
+
+    assert len(fake.calls) == 3
+    assert server.single_flight.stats()["executions"] == 0
+
+
+def test_rated_movies_reach_the_graph_and_invalidate_the_cache(monkeypatch):
+    """Test: a flushed rating shows in the user's preferences and bumps the graph version"""
+    monkeypatch.setattr(server, "backend", backends.InMemoryBackend.from_directory(server.MEMORY_DATA_DIR))
+    monkeypatch.setattr(server, "rating_buffer", RatingBuffer(
+        lambda rows: server.backend.write_ratings(rows), on_flush=server.ratings_flushed
+    ))
+    monkeypatch.setattr(server, "graph_version", server.graph_version)
+    version = server.graph_version
+
+    async def scenario():
+        before = await server.call_tool("get_user_preferences", {"user_name": "Alice"})
+        queued = await server.call_tool("rate_movies", {"ratings": [
+            {"user_name": "Alice", "title": "John Wick", "rating": 4},
+            {"user_name": "Alice", "title": "Unknown Movie", "rating": 3},
+        ]})
+        await server.rating_buffer.flush()
+        after = await server.call_tool("get_user_preferences", {"user_name": "Alice"})
+        return before, queued, after
+
+    before, queued, after = asyncio.run(scenario())
+
+    assert queued[0].text.startswith("Queued 2 rating(s), 2 pending")
+    assert "John Wick" not in before[0].text
+    assert "John Wick (2014) - User Rating: 4/5" in after[0].text
+    assert server.graph_version == version + 1
+    assert server.rating_buffer.stats()["skipped"] == 1
+
+
+def test_rating_out_of_range_is_rejected():
+    """Test: ratings outside 1-5 never reach the buffer"""
+    with pytest.raises(ValueError):
+        asyncio.run(server.call_tool("rate_movie", {"user_name": "Alice", "title": "Inception", "rating": 9}))
+
+
+def test_pagerank_strategy_explains_its_recommendations(monkeypatch):
+    """Test: recommend_movies with strategy=pagerank walks the in-memory graph"""
+    monkeypatch.setattr(server, "backend", backends.InMemoryBackend.from_directory(server.MEMORY_DATA_DIR))
+    monkeypatch.setattr(server, "walk_model", server.RefreshingModel("pagerank", server.build_walk_model, 600))
+
+    text = asyncio.run(server.call_tool("recommend_movies", {"user_name": "Alice", "strategy": "pagerank"}))[0].text
+
+    assert text.startswith("Recommendations for Alice:")
+    assert "Why: Close to your favorites through shared cast, crew, genres and fans" in text
+    assert "Inception" not in text
+
+
+def test_stale_models_are_rebuilt_in_the_background(monkeypatch):
+    """Test: after a graph change the old model is served at once while a rebuild runs, at most once per interval"""
+    monkeypatch.setattr(server, "graph_version", 0)
+    builds = []
+
+    async def build():
+        await asyncio.sleep(0.05)
+        builds.append(server.graph_version)
+        return f"model {len(builds)}"
+
+    model = server.RefreshingModel("test", build, refresh_seconds=600, min_interval=0.1)
+
+    async def scenario():
+        served = [await model.get()]
+        server.bump_graph_version()
+        served.append(await model.get())
+        await asyncio.sleep(0.15)
+        start = time.perf_counter()
+        served.append(await model.get())
+        waited = time.perf_counter() - start
+        await asyncio.sleep(0.1)
+        served.append(await model.get())
+        return served, waited
+
+    served, waited = asyncio.run(scenario())
+
+    # Le changement arrivé avant MODEL_REBUILD_INTERVAL attend ; la reconstruction ne bloque pas l'appel
+    assert served == ["model 1", "model 1", "model 1", "model 2"]
+    assert waited < 0.05
+    assert builds == [0, 1]
+
+
+def test_rebuilt_model_replaces_cached_recommendations(monkeypatch, tmp_path):
+    """Test: once the rebuilt model is in place, answers cached from the stale one are no longer served"""
+    generate_graph(tmp_path, 300, seed=42)
+    monkeypatch.setattr(server, "backend", backends.InMemoryBackend.from_directory(tmp_path))
+    monkeypatch.setattr(server, "rating_buffer", RatingBuffer(
+        lambda rows: server.backend.write_ratings(rows), on_flush=server.ratings_flushed
+    ))
+    monkeypatch.setattr(server, "graph_version", server.graph_version)
+    monkeypatch.setattr(server, "collaborative_model", server.RefreshingModel(
+        "collaborative", server.build_collaborative_model, 600, min_interval=0
+    ))
+    arguments = {"user_name": "User 1", "strategy": "collaborative", "format": "json"}
+
+    async def recommended():
+        text = (await server.call_tool("recommend_movies", arguments))[0].text
+        return [row[1] for row in json.loads(text)["rows"]]
+
+    async def scenario():
+        titles = await recommended()
+        await server.call_tool("rate_movies", {"ratings": [
+            {"user_name": "User 1", "title": title, "rating": 5} for title in titles
+        ]})
+        await server.rating_buffer.flush()
+        # Le modèle périmé répond pendant la reconstruction
+        await recommended()
+        # La reconstruction peut déjà être finie pendant l'appel précédent
+        if server.collaborative_model._rebuild is not None:
+            await server.collaborative_model._rebuild
+        assert server.collaborative_model.rebuilds == 2
+        return titles, await recommended()
+
+    titles, after = asyncio.run(scenario())
+
+    assert titles
+    assert after
+    assert not set(titles) & set(after)
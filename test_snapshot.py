@@ -0,0 +1,162 @@
+import json
+
+import pytest
+
+import loader
+import snapshot
+
+# Étiquette -> id interne -> ligne exportée
+GRAPH = {
+    "Genre": {0: {"name": "Action"}, 1: {"name": "Sci-Fi"}},
+    "Movie": {i: {"title": f"Movie {i}", "year": 2000 + i, "rating": 7.5, "description": None, "genres": ["Action"]}
+              for i in range(2, 27)},
+}
+
+EXPORTS = {
+    "genres": [("Genre", snapshot.EXPORT_GENRES)],
+    "movies": [("Movie", snapshot.EXPORT_MOVIES)],
+}
+
+
+class FakeRecord(dict):
+    def data(self):
+        return dict(self)
+
+
+class FakeResult:
+    def __init__(self, records):
+        self.records = records
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def single(self):
+        return self.records[0]
+
+    def consume(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **params):
+        for label, nodes in GRAPH.items():
+            if query == snapshot.ID_BOUNDS.format(label=label):
+                return FakeResult([FakeRecord(low=min(nodes), high=max(nodes))])
+        label = next(label for sources in snapshot.EXPORTS.values() for label, q in sources if q == query)
+        self.driver.ranges.append((label, params["low"], params["high"]))
+        if (label, params["low"]) in self.driver.fail_at:
+            raise ConnectionError("Neo4j is down")
+        nodes = GRAPH[label]
+        return FakeResult([FakeRecord(nodes[i]) for i in range(params["low"], params["high"]) if i in nodes])
+
+    def execute_write(self, work, *args):
+        return work(self.driver, *args)
+
+
+class FakeDriver:
+    """Reads from GRAPH; records the id ranges read and the UNWIND writes"""
+
+    def __init__(self, fail_at=()):
+        self.fail_at = set(fail_at)
+        self.ranges = []
+        self.writes = []
+
+    def session(self, **config):
+        return FakeSession(self)
+
+    # Le driver sert aussi de transaction d'écriture
+    def run(self, statement, rows):
+        self.writes.append((statement, rows))
+        return FakeResult([])
+
+
+def test_export_writes_gzipped_chunks_per_id_range(tmp_path):
+    """Test: each label is split into id ranges, read in parallel, and written as loader-format chunks"""
+    counts = snapshot.export_graph(FakeDriver(), tmp_path, partition_size=10, workers=3, exports=EXPORTS)
+
+    assert counts == {"genres": 2, "movies": 25}
+    chunks = snapshot.dataset_chunks(tmp_path, "movies")
+    assert [chunk.name for chunk in chunks] == [f"movies-movie-0000{i}.jsonl.gz" for i in range(3)]
+    rows = [row for chunk in chunks for row in loader.read_rows(chunk)]
+    assert [row["title"] for row in rows] == [f"Movie {i}" for i in range(2, 27)]
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_export_resumes_from_the_checkpoint(tmp_path):
+    """Test: after a failed range, a second run only reads the ranges missing from the checkpoint"""
+    failing = FakeDriver(fail_at=[("Movie", 12)])
+    with pytest.raises(ConnectionError):
+        snapshot.export_graph(failing, tmp_path, partition_size=10, workers=1, exports=EXPORTS)
+
+    resumed = FakeDriver()
+    counts = snapshot.export_graph(resumed, tmp_path, partition_size=10, workers=2, exports=EXPORTS)
+
+    assert counts == {"genres": 2, "movies": 25}
+    assert ("Movie", 2, 12) not in resumed.ranges
+    assert ("Movie", 12, 22) in resumed.ranges
+    with pytest.raises(ValueError):
+        snapshot.export_graph(resumed, tmp_path, partition_size=5, exports=EXPORTS)
+
+
+def test_import_reloads_chunks_in_loader_order_and_resumes(tmp_path):
+    """Test: chunks are written back with the loader queries, genres first, loaded chunks skipped"""
+    snapshot.export_graph(FakeDriver(), tmp_path, partition_size=10, exports=EXPORTS)
+    driver = FakeDriver()
+    snapshot.import_graph(driver, tmp_path, batch_size=100, exports=EXPORTS)
+    assert [statement for statement, _ in driver.writes] == [loader.LOAD_GENRES] + [loader.LOAD_MOVIES] * 3
+
+    # Import interrompu avant le dernier morceau
+    checkpoint = json.loads((tmp_path / snapshot.IMPORT_CHECKPOINT).read_text())
+    del checkpoint["done"]["movies-movie-00002.jsonl.gz"]
+    (tmp_path / snapshot.IMPORT_CHECKPOINT).write_text(json.dumps(checkpoint))
+    resumed = FakeDriver()
+    counts = snapshot.import_graph(resumed, tmp_path, batch_size=100, exports=EXPORTS)
+
+    assert counts == {"genres": 2, "movies": 25}
+    assert [statement for statement, _ in resumed.writes] == [loader.LOAD_MOVIES]
+    assert resumed.writes[-1][1][-1]["title"] == "Movie 26"
+
+
+def test_restart_drops_stale_chunks_and_import_follows_the_checkpoint(tmp_path):
+    """Test: chunks of an earlier export are deleted on restart and never imported"""
+    snapshot.export_graph(FakeDriver(), tmp_path, partition_size=10, exports=EXPORTS)
+    stale = tmp_path / "movies-movie-00002.jsonl.gz"
+    stale_copy = stale.read_bytes()
+
+    snapshot.reset_export(tmp_path)
+    assert not list(tmp_path.iterdir())
+    snapshot.export_graph(FakeDriver(), tmp_path, partition_size=20, exports=EXPORTS)
+    assert not stale.exists()
+
+    # Un morceau laissé par un autre export n'est pas rechargé
+    stale.write_bytes(stale_copy)
+    driver = FakeDriver()
+    counts = snapshot.import_graph(driver, tmp_path, batch_size=100, exports=EXPORTS)
+
+    assert counts == {"genres": 2, "movies": 25}
+    assert sum(len(rows) for _, rows in driver.writes) == 27
+
+
+def test_import_refuses_an_interrupted_export(tmp_path):
+    """Test: chunks missing from the export checkpoint stop the import unless allow_partial is set"""
+    with pytest.raises(ConnectionError):
+        snapshot.export_graph(FakeDriver(fail_at=[("Movie", 12)]), tmp_path, partition_size=10, workers=1,
+                              exports=EXPORTS)
+    assert snapshot.missing_chunks(tmp_path, EXPORTS) == ["movies-movie-00001.jsonl.gz", "movies-movie-00002.jsonl.gz"]
+
+    driver = FakeDriver()
+    with pytest.raises(ValueError, match="incomplete export"):
+        snapshot.import_graph(driver, tmp_path, batch_size=100, exports=EXPORTS)
+    assert not driver.writes
+
+    counts = snapshot.import_graph(driver, tmp_path, batch_size=100, allow_partial=True, exports=EXPORTS)
+    assert counts == {"genres": 2, "movies": 10}